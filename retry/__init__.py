@@ -1,6 +1,48 @@
-from .retry import Retry, RetryError, TryAgain
+from .retry import Retry, RetryError, CircuitOpenError, TryAgain
 from .conditions import (
     stop_after_attempt, stop_after_delay, stop_before_delay, combine_stop_conditions,
     wait_fixed, wait_random, wait_random_exponential, wait_chain, wait_exponential,
     retry_if_exception_type, retry_if_not_exception_type, retry_if_result, retry_if_not_result, combine_retry_conditions
 )
+from .shutdown import ShutdownHandle, default_shutdown
+
+# Optional subsystems, imported on first attribute access to keep the sync decorator path cheap to import
+_LAZY_ATTRIBUTES = {
+    "AttemptLog": "attempt_log",
+    "AttemptRecord": "attempt_log",
+    "AttemptExporter": "attempt_log",
+    "JsonLinesExporter": "attempt_log",
+    "SpanExporter": "attempt_log",
+    "SharedRetryState": "shared_state",
+    "SharedPolicyState": "shared_state",
+    "FailureState": "state",
+    "KeyedFailureState": "state",
+}
+_LAZY_SUBMODULES = ("attempt_log", "autotune", "pool", "shared_state", "state")
+
+__all__ = [
+    "Retry", "RetryError", "CircuitOpenError", "TryAgain",
+    "stop_after_attempt", "stop_after_delay", "stop_before_delay", "combine_stop_conditions",
+    "wait_fixed", "wait_random", "wait_random_exponential", "wait_chain", "wait_exponential",
+    "retry_if_exception_type", "retry_if_not_exception_type", "retry_if_result", "retry_if_not_result",
+    "combine_retry_conditions", "ShutdownHandle", "default_shutdown",
+] + list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    """
+    Imports optional subsystems on first use.
+    """
+    import importlib
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module("." + _LAZY_ATTRIBUTES[name], __name__), name)
+    elif name in _LAZY_SUBMODULES:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    globals()[name] = value  # Cache, later lookups no longer go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | set(_LAZY_SUBMODULES))
@@ -0,0 +1,226 @@
+import os
+import abc
+import json
+import time
+import random
+import itertools
+import threading
+from collections import deque, namedtuple
+from typing import Callable, Iterable, List, Optional
+
+
+_call_ids = itertools.count(1)  # Shared by every AttemptLog of the process, so call ids never collide
+
+# Compact record describing a single attempt
+AttemptRecord = namedtuple(
+    "AttemptRecord",
+    ["call_id", "name", "attempt", "outcome", "exception", "started_at", "latency", "delay"]
+)
+AttemptRecord.__doc__ = """
+Single attempt of a retried call.
+
+Fields:
+    call_id: Identifier shared by all attempts of the same call, "<pid>-<n>", unique across processes on a host.
+    name: Qualified name of the retried function.
+    attempt: The attempt number, starting at 1.
+    outcome: "ok" for an accepted result, "rejected" for a result that triggered a retry, "error" for an exception.
+    exception: Name of the exception type raised by the attempt, or None.
+    started_at: Wall clock time (seconds since the epoch) when the attempt started.
+    latency: Duration of the attempt in seconds.
+    delay: The wait chosen before the next attempt, or None if no further attempt was made.
+"""
+
+
+class AttemptExporter(abc.ABC):
+    """
+    Interface for exporters receiving batches of attempt records from an AttemptLog.
+    """
+
+    @abc.abstractmethod
+    def export(self, records: List[AttemptRecord]):
+        """Exports a batch of attempt records."""
+
+
+class JsonLinesExporter(AttemptExporter):
+    """
+    Writes attempt records as JSON lines.
+
+    Args:
+        stream: Text stream the records are written to.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def export(self, records: List[AttemptRecord]):
+        self.stream.write("".join(json.dumps(record._asdict()) + "\n" for record in records))
+        self.stream.flush()
+
+
+class SpanExporter(AttemptExporter):
+    """
+    Turns attempt records into OpenTelemetry-style spans.
+
+    Args:
+        tracer: Tracer providing ``start_span(name, start_time=..., attributes=...)`` returning spans with
+            ``end(end_time=...)``, such as ``opentelemetry.trace.get_tracer(__name__)``.
+    """
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def export(self, records: List[AttemptRecord]):
+        for record in records:
+            attributes = {
+                "retry.call_id": record.call_id,
+                "retry.attempt": record.attempt,
+                "retry.outcome": record.outcome,
+            }
+            if record.exception is not None:
+                attributes["retry.exception"] = record.exception
+            if record.delay is not None:
+                attributes["retry.delay"] = record.delay
+            start_time = int(record.started_at * 1e9)  # Spans use nanoseconds since the epoch
+            span = self.tracer.start_span(record.name, start_time=start_time, attributes=attributes)
+            span.end(end_time=start_time + int(record.latency * 1e9))
+
+
+class _CallTrace:
+    """
+    Collects the attempts of a single sampled call.
+    """
+    __slots__ = ("log", "call_id", "name", "pending")
+
+    def __init__(self, log, call_id: str, name: str, pending: Optional[list]):
+        self.log = log
+        self.call_id = call_id
+        self.name = name
+        self.pending = pending  # Buffered records for tail sampling, None for head sampling
+
+    def record(self, attempt: int, outcome: str, exception: Optional[Exception], started: float,
+               delay: Optional[float]):
+        """Records an attempt started at ``started`` (a ``time.perf_counter()`` value)."""
+        latency = time.perf_counter() - started
+        record = AttemptRecord(self.call_id, self.name, attempt, outcome,
+                               type(exception).__name__ if exception is not None else None,
+                               time.time() - latency, latency, delay)
+        if self.pending is None:
+            self.log.records.append(record)
+        else:
+            self.pending.append(record)
+
+    def finish(self):
+        """Ends the call, committing buffered records if tail sampling keeps them."""
+        if not self.pending:
+            return  # Head sampling records directly, or no attempt was made (e.g. CircuitOpenError)
+        if len(self.pending) > 1 or self.pending[-1].outcome != "ok" or self.log.rng() < self.log.sample_rate:
+            self.log.records.extend(self.pending)
+
+
+class AttemptLog:
+    """
+    Fixed-size ring buffer of attempt records, attached to a Retry through its ``attempt_log`` argument.
+
+    Args:
+        capacity: Maximum number of records kept; the oldest records are dropped first.
+        sample_rate: Fraction of calls that are recorded.
+        sampling: "head" decides whether to record a call before its first attempt. "tail" buffers the attempts
+            of every call and always keeps calls that retried or failed, keeping the rest at ``sample_rate``.
+        exporter: AttemptExporter receiving the records on flush.
+        batch_size: Maximum number of records handed to the exporter at once.
+    """
+
+    def __init__(self,
+                 capacity: int = 1024,
+                 sample_rate: float = 1.0,
+                 sampling: str = "head",
+                 exporter: Optional[AttemptExporter] = None,
+                 batch_size: int = 256,
+                 rng: Callable[[], float] = random.random):
+        if sampling not in ("head", "tail"):
+            raise ValueError("sampling must be 'head' or 'tail'")
+        self.records = deque(maxlen=capacity)  # Ring buffer of attempt records
+        self.sample_rate = sample_rate
+        self.sampling = sampling
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.rng = rng
+        self._stop_event = None
+        self._thread = None
+
+    def begin(self, func: Callable) -> Optional[_CallTrace]:
+        """
+        Starts tracing a call, returning None when head sampling skips it.
+        """
+        if self.sampling == "head":
+            if self.sample_rate < 1.0 and self.rng() >= self.sample_rate:
+                return None
+            pending = None
+        else:
+            pending = []
+        name = getattr(func, "__qualname__", None) or repr(func)
+        call_id = "{}-{}".format(os.getpid(), next(_call_ids))  # The pid keeps ids unique across workers
+        return _CallTrace(self, call_id, name, pending)
+
+    def snapshot(self) -> List[AttemptRecord]:
+        """Returns the records currently held in the buffer."""
+        return list(self.records)
+
+    def drain(self, limit: Optional[int] = None) -> List[AttemptRecord]:
+        """Removes and returns up to ``limit`` of the oldest records."""
+        drained = []
+        while limit is None or len(drained) < limit:
+            try:
+                drained.append(self.records.popleft())
+            except IndexError:
+                break
+        return drained
+
+    def flush(self) -> int:
+        """
+        Hands all buffered records to the exporter in batches and returns the number of records exported.
+        """
+        if self.exporter is None:
+            return 0
+        exported = 0
+        while True:
+            batch = self.drain(self.batch_size)
+            if not batch:
+                return exported
+            self.exporter.export(batch)
+            exported += len(batch)
+
+    def start(self, interval: float = 5.0):
+        """
+        Starts a background thread flushing the buffer every ``interval`` seconds.
+        """
+        if self._thread is not None:
+            return
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(interval, self._stop_event),
+                                        name="retry-attempt-log", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread and flushes the remaining records.
+        """
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self, interval: float, stop_event: threading.Event):
+        while not stop_event.wait(interval):
+            self.flush()
+
+
+def read_attempt_records(lines: Iterable[str]):
+    """
+    Parses JSON lines written by JsonLinesExporter back into attempt records.
+    """
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield AttemptRecord(**json.loads(line))
@@ -0,0 +1,232 @@
+"""
+Offline tuning of ``stop_after_attempt`` and ``wait_exponential`` from recorded attempt traces.
+
+Traces are JSON lines with one attempt per line, as written by JsonLinesExporter::
+
+    {"call_id": "4242-17", "name": "fetch", "attempt": 1, "outcome": "error", "latency": 0.120, "delay": 0.5}
+    {"call_id": "4242-17", "name": "fetch", "attempt": 2, "outcome": "ok", "latency": 0.034, "delay": null}
+
+Attempts of a call must appear in order and are grouped by ``name`` and ``call_id``. A call ends with an "ok"
+attempt, or with a failed attempt whose ``delay`` is null because no further attempt was made. A call that never
+succeeded in the trace is assumed to keep failing if it were retried more often, each further attempt taking
+the average latency of its recorded attempts.
+
+Usage::
+
+    python -m retry.autotune traces.jsonl --max-amplification 1.5 --min-success-rate 0.98
+"""
+import json
+import math
+import argparse
+import itertools
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from typing import Iterable, List, Optional, Sequence
+
+from .conditions import stop_after_attempt, wait_exponential
+
+
+class TraceSummary:
+    """
+    Compact summary of recorded calls: the latency spent until the first success, grouped by the attempt
+    that succeeded, and the latency spent until each failed attempt ended, grouped by attempt. This is all the
+    replay needs, so traces of any size are summarized in a single pass.
+    """
+
+    def __init__(self):
+        self.successes = {}  # Attempt of first success -> latencies until then
+        self.failures = {}  # Failed attempt -> latencies of the calls until the end of that attempt
+        self.exhausted = {}  # Attempts made -> latencies of the calls that never succeeded
+        self._sorted = False
+
+    @property
+    def failed(self) -> int:
+        """Number of recorded calls that never succeeded."""
+        return sum(len(latencies) for latencies in self.exhausted.values())
+
+    @property
+    def calls(self) -> int:
+        """Number of recorded calls."""
+        return self.failed + sum(len(latencies) for latencies in self.successes.values())
+
+    def add_call(self, success_attempt: Optional[int], latency: float = 0.0,
+                 cumulative: Optional[Sequence[float]] = None):
+        """
+        Adds a call that first succeeded at ``success_attempt`` (None if it never did) after ``latency``.
+
+        Args:
+            success_attempt: Attempt that succeeded, or None if the call never succeeded.
+            latency: Latency of the call, spread evenly over its attempts when ``cumulative`` is not given.
+            cumulative: Latency spent by the call at the end of each of its attempts.
+        """
+        if cumulative is None:
+            count = success_attempt or 1
+            cumulative = [latency * attempt / count for attempt in range(1, count + 1)]
+        failed = len(cumulative) if success_attempt is None else success_attempt - 1
+        for attempt in range(1, failed + 1):
+            self.failures.setdefault(attempt, array("d")).append(cumulative[attempt - 1])
+        if success_attempt is None:
+            self.exhausted.setdefault(failed, array("d")).append(cumulative[-1])
+        else:
+            self.successes.setdefault(success_attempt, array("d")).append(cumulative[success_attempt - 1])
+        self._sorted = False
+
+    def _sort(self):
+        """Sorts the latencies of every group, as needed by the replay."""
+        if not self._sorted:
+            for groups in (self.successes, self.failures, self.exhausted):
+                for attempt, latencies in groups.items():
+                    groups[attempt] = array("d", sorted(latencies))
+            self._sorted = True
+
+
+def summarize_traces(lines: Iterable[str]) -> TraceSummary:
+    """
+    Streams JSON lines of attempt records into a TraceSummary.
+
+    Calls are identified by their ``name`` and ``call_id``. Only calls that have not ended yet are kept in
+    memory; an "ok" attempt, or a failed attempt with a null ``delay``, is the last record of its call.
+    """
+    summary = TraceSummary()
+    pending = {}  # (name, call id) -> latency at the end of each attempt so far, for calls that have not ended
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        call = (record.get("name"), record["call_id"])
+        cumulative = pending.pop(call, None)
+        if cumulative is None:
+            cumulative = array("d")
+        cumulative.append((cumulative[-1] if cumulative else 0.0) + float(record["latency"]))
+        if record.get("outcome") == "ok":
+            summary.add_call(len(cumulative), cumulative=cumulative)
+        elif "delay" in record and record["delay"] is None:
+            summary.add_call(None, cumulative=cumulative)  # No further attempt was made, the call failed
+        else:
+            pending[call] = cumulative
+    for cumulative in pending.values():
+        summary.add_call(None, cumulative=cumulative)  # Still open when the trace ended
+    return summary
+
+
+class Candidate(namedtuple("Candidate", ["attempts", "multiplier", "min_wait", "max_wait",
+                                         "p99", "amplification", "success_rate"])):
+    """
+    Replay result of one policy.
+
+    Fields:
+        attempts: Argument of stop_after_attempt.
+        multiplier, min_wait, max_wait: Arguments of wait_exponential.
+        p99: End-to-end latency quantile in seconds over all calls, including the calls that fail.
+        amplification: Average number of attempts per call.
+        success_rate: Fraction of calls that succeed.
+    """
+    __slots__ = ()
+
+    def to_retry(self, **kwargs):
+        """Returns a Retry using this policy, ``kwargs`` are passed on to Retry."""
+        from .retry import Retry
+        return Retry(stop_condition=stop_after_attempt(self.attempts),
+                     wait_condition=wait_exponential(self.multiplier, self.min_wait, self.max_wait), **kwargs)
+
+
+def replay(summary: TraceSummary, attempts: int, multiplier: float, min_wait: float, max_wait: float,
+           quantile: float = 0.99) -> Candidate:
+    """
+    Replays the summarized calls under virtual time with the given policy.
+
+    A call that first succeeded at attempt ``s <= attempts`` takes its recorded latency plus the waits before
+    attempts 2..s. Every other call fails after ``attempts`` attempts, taking the latency recorded until the end
+    of that attempt (extrapolated for calls with fewer recorded attempts) plus the waits before attempts
+    2..attempts. The quantile is found by bisection over the sorted groups, so the cost does not depend on the
+    number of calls.
+    """
+    wait = wait_exponential(multiplier, min_wait, max_wait)
+    waited = list(itertools.accumulate([0.0] + [wait(attempt) for attempt in range(1, attempts)]))
+    summary._sort()
+    groups = [(latencies, waited[attempt - 1], 1.0) for attempt, latencies in summary.successes.items()
+              if attempt <= attempts and latencies]  # (sorted latencies, added wait, latency scale)
+    succeeded = sum(len(latencies) for latencies, _, _ in groups)
+    used = sum(attempt * len(latencies) for attempt, latencies in summary.successes.items() if attempt <= attempts)
+    if summary.failures.get(attempts):
+        groups.append((summary.failures[attempts], waited[-1], 1.0))  # Calls whose last allowed attempt failed
+    groups.extend((latencies, waited[-1], attempts / made) for made, latencies in summary.exhausted.items()
+                  if made < attempts and latencies)  # Calls failing again in the attempts they never made
+    total = summary.calls
+    amplification = (used + (total - succeeded) * attempts) / total if total else 0.0
+    p99 = _quantile(groups, max(1, math.ceil(quantile * total))) if total else math.inf
+    return Candidate(attempts, multiplier, min_wait, max_wait, p99, amplification,
+                     succeeded / total if total else 0.0)
+
+
+def _quantile(groups: List[tuple], rank: int) -> float:
+    """Smallest latency such that ``rank`` calls of the scaled, shifted, sorted groups complete within it."""
+    low = min(latencies[0] * scale + shift for latencies, shift, scale in groups)
+    high = max(latencies[-1] * scale + shift for latencies, shift, scale in groups)
+    for _ in range(100):
+        if high - low <= 1e-9 * max(1.0, high):
+            break
+        middle = (low + high) / 2
+        if sum(bisect_right(latencies, (middle - shift) / scale) for latencies, shift, scale in groups) >= rank:
+            high = middle
+        else:
+            low = middle
+    return high
+
+
+def tune(summary: TraceSummary,
+         attempts: Sequence[int] = (1, 2, 3, 4, 5, 6),
+         multipliers: Sequence[float] = (0.05, 0.1, 0.25, 0.5, 1, 2),
+         min_waits: Sequence[float] = (0, 0.05, 0.1, 0.5, 1),
+         max_waits: Sequence[float] = (1, 5, 10, 30),
+         max_amplification: float = 2.0,
+         quantile: float = 0.99,
+         min_success_rate: Optional[float] = None) -> List[Candidate]:
+    """
+    Replays every combination of the candidate values and returns the policies within ``max_amplification`` and
+    reaching ``min_success_rate``, best first: lowest quantile latency, then highest success rate, then lowest
+    amplification. By default ``min_success_rate`` is the highest success rate of the policies within
+    ``max_amplification``.
+    """
+    candidates = []
+    for attempt_count, multiplier, min_wait, max_wait in itertools.product(attempts, multipliers, min_waits,
+                                                                          max_waits):
+        if min_wait > max_wait:
+            continue
+        candidate = replay(summary, attempt_count, multiplier, min_wait, max_wait, quantile)
+        if candidate.amplification <= max_amplification:
+            candidates.append(candidate)
+    if candidates and min_success_rate is None:
+        min_success_rate = max(candidate.success_rate for candidate in candidates) - 1e-12
+    candidates = [candidate for candidate in candidates if candidate.success_rate >= (min_success_rate or 0.0)]
+    candidates.sort(key=lambda candidate: (candidate.p99, -candidate.success_rate, candidate.amplification))
+    return candidates
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m retry.autotune", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("traces", help="JSON lines file of attempt records")
+    parser.add_argument("--max-amplification", type=float, default=2.0, help="Maximum attempts per call")
+    parser.add_argument("--quantile", type=float, default=0.99, help="Latency quantile to minimize")
+    parser.add_argument("--min-success-rate", type=float, default=None,
+                        help="Minimum fraction of successful calls, default: the highest any policy reaches")
+    parser.add_argument("--top", type=int, default=5, help="Number of policies to show")
+    args = parser.parse_args(argv)
+    with open(args.traces, encoding="utf-8") as lines:
+        summary = summarize_traces(lines)
+    candidates = tune(summary, max_amplification=args.max_amplification, quantile=args.quantile,
+                      min_success_rate=args.min_success_rate)
+    if not candidates:
+        parser.exit(1, "No policy within an amplification of {} reaching the success rate\n".format(
+            args.max_amplification))
+    for candidate in candidates[:args.top]:
+        print("stop_after_attempt({}), wait_exponential(multiplier={}, min_wait={}, max_wait={}): "
+              "p{:g}={:.4f}s amplification={:.3f} success_rate={:.4f}".format(
+                  candidate.attempts, candidate.multiplier, candidate.min_wait, candidate.max_wait,
+                  args.quantile * 100, candidate.p99, candidate.amplification, candidate.success_rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
+from __future__ import annotations  # Annotations are not evaluated at runtime
 import time
 import random
-from typing import Callable, Type, Optional, Any
+TYPE_CHECKING = False  # typing is only needed by type checkers, skipping it keeps imports fast
+if TYPE_CHECKING:
+    from typing import Callable, Type, Optional, Any
 
 
 # Stop conditions
@@ -0,0 +1,256 @@
+import os
+import time
+import heapq
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, List, Optional
+from .retry import CircuitOpenError
+
+_SHUTDOWN_POLL_INTERVAL = 0.05  # Longest wait on running tasks before checking for shutdown
+
+
+def _run_chunk(func: Callable, chunk: list) -> list:
+    """
+    Runs a chunk of tasks in a worker process, capturing the outcome and latency of each task separately.
+    """
+    outcomes = []
+    for item in chunk:
+        started = time.perf_counter()
+        try:
+            ok, value = True, func(item)
+        except Exception as e:
+            ok, value = False, e
+        outcomes.append((ok, value, time.perf_counter() - started))
+    return outcomes
+
+
+class PoolRunner:
+    """
+    Runs tasks on a process pool, retrying each task with the stop and wait conditions of a Retry.
+
+    Tasks are submitted in chunks of ``chunksize`` to keep pickling costs low, at most one chunk per worker at a
+    time. When a worker dies, the pool is replaced and only the chunks lost with it are dispatched again, in
+    parallel with the other work. A chunk lost again is split in halves, and a single task lost again runs alone
+    in the pool, so a crash is only counted as a failed attempt (with the BrokenProcessPool exception) for the
+    task that caused it.
+
+    Each task is one call for the Retry: ``before`` runs before each dispatch of the task, ``after`` once it
+    succeeds, the ``failure_state`` receives the state of ``func(item)`` and the ``attempt_log`` records the
+    attempts of each task. Callbacks and state updates run in the calling process. A task waiting for its
+    next attempt is counted as in flight by the shutdown handle until it finishes.
+
+    Args:
+        retry: The Retry providing the conditions and callbacks.
+        func: Picklable callable applied to each item.
+        max_workers: Number of worker processes.
+        chunksize: Number of tasks sent to a worker at once.
+        mp_context: Optional multiprocessing context used to start workers.
+    """
+
+    def __init__(self, retry, func: Callable, max_workers: Optional[int] = None, chunksize: int = 1,
+                 mp_context=None):
+        self.retry = retry
+        self.func = func
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunksize = max(1, chunksize)
+        exceptions = retry.retry_on_exceptions
+        self.retry_on_exceptions = tuple(exceptions) if isinstance(exceptions, (tuple, list)) else (exceptions,)
+        self.mp_context = mp_context
+        self.pool = None
+
+    def map(self, items: Iterable) -> List:
+        """
+        Runs ``func`` on every item and returns the results in order.
+        """
+        self.items = list(items)
+        self.results = [None] * len(self.items)
+        self.attempts = [0] * len(self.items)
+        log, failure_state = self.retry.attempt_log, self.retry.failure_state
+        self.traces = [log.begin(self.func) for _ in self.items] if log is not None else None  # Trace of each task
+        self.states = ([failure_state.for_call((item,), {}) for item in self.items]
+                       if failure_state is not None else None)  # Failure state of each task
+        self.final = set()  # Tasks running their final attempt after shutdown
+        self.retrying = set()  # Tasks counted as in flight by the shutdown handle
+        self.last = {}  # Last outcome (ok, value) of each delayed task
+        self.ready = deque(range(len(self.items)))  # Tasks waiting to be submitted
+        self.lost = deque()  # Chunks lost in a crash waiting to run again
+        self.suspects = deque()  # Tasks lost again on their own waiting to run alone
+        self.suspected = set()  # Tasks lost in a crash that have not completed since
+        self.isolated = None  # Future of the suspect running alone, if any
+        self.delayed = []  # Heap of (ready time, task) for tasks waiting before their next attempt
+        self.running = {}  # Future -> (pool it was submitted to, tasks of the submitted chunk, submission time)
+        self.pool = self._new_pool()
+        try:
+            while self.ready or self.lost or self.suspects or self.delayed or self.running:
+                self._release_delayed()
+                self._submit_ready()
+                if not self.running:
+                    if not self.delayed:
+                        continue
+                    self.retry.shutdown.wait(max(0.0, self.delayed[0][0] - time.monotonic()))  # Wait for next retry
+                    continue
+                timeout = None
+                if self.delayed:
+                    timeout = min(max(0.0, self.delayed[0][0] - time.monotonic()), _SHUTDOWN_POLL_INTERVAL)
+                done, _ = wait(self.running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(future, *self.running.pop(future))
+            return self.results
+        finally:
+            for future in self.running:
+                future.cancel()
+            self.pool.shutdown(wait=False)
+            for index in range(len(self.items)):
+                self._finish(index)  # Tasks stopped early are no longer in flight, commit their attempts
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context)
+
+    def _replace_pool(self):
+        """Replaces a broken pool, the tasks lost with it are re-dispatched by the caller."""
+        self.pool.shutdown(wait=False)
+        self.pool = self._new_pool()
+
+    def _release_delayed(self):
+        now = time.monotonic()
+        if self.retry.shutdown.is_set():
+            now = float("inf")  # Shutdown: stop waiting for any delayed task
+            if not self.retry.shutdown.final_attempt:
+                for _, index in self.delayed:
+                    ok, value = self.last[index]
+                    if not ok:
+                        raise self.retry._give_up(value)  # Fail fast with the last exception of the task
+                    self.results[index] = value  # Fail fast, keep the last result
+                    self._finish(index)
+                self.delayed = []
+            self.final.update(index for _, index in self.delayed)
+        while self.delayed and self.delayed[0][0] <= now:
+            index = heapq.heappop(self.delayed)[1]
+            (self.suspects if index in self.suspected else self.ready).append(index)
+
+    def _submit_ready(self):
+        if self.isolated is not None:
+            return  # A suspect runs alone
+        if self.suspects:
+            if not self.running:
+                chunk = [self.suspects.popleft()]
+                self.isolated = self._submit(chunk)
+                if self.isolated is None:
+                    self.suspects.appendleft(chunk[0])  # Not dispatched, resubmit on the new pool
+            return  # Let the running chunks finish before isolating the next suspect
+        while (self.lost or self.ready) and len(self.running) < self.max_workers:
+            if self.lost:
+                chunk = self.lost.popleft()
+                if self._submit(chunk) is None:
+                    self.lost.appendleft(chunk)  # Not dispatched, resubmit on the new pool
+            else:
+                chunk = [self.ready.popleft() for _ in range(min(self.chunksize, len(self.ready)))]
+                if self._submit(chunk) is None:
+                    self.ready.extendleft(reversed(chunk))  # Not dispatched, resubmit on the new pool
+
+    def _submit(self, chunk: list):
+        for index in chunk:
+            if self.states is not None and self.states[index].is_open():
+                ok, value = self.last.get(index, (True, None))
+                raise CircuitOpenError(None if ok else value)  # Fail fast without attempting the task
+            if self.retry.before:
+                self.retry.before(self.retry)  # Call before callback if provided
+        try:
+            future = self.pool.submit(_run_chunk, self.func, [self.items[index] for index in chunk])
+        except BrokenProcessPool:
+            self._replace_pool()
+            return None
+        self.running[future] = (self.pool, chunk, time.perf_counter())
+        return future
+
+    def _collect(self, future, pool: ProcessPoolExecutor, chunk: list, submitted: float):
+        try:
+            outcomes = future.result()
+        except BrokenProcessPool as e:
+            if pool is self.pool:
+                self._replace_pool()  # First chunk lost with this pool, the others are re-dispatched as well
+            if future is self.isolated:
+                self.isolated = None
+                self._failed(chunk[0], e, submitted)  # The suspect crashed the pool while running alone
+            elif chunk[0] not in self.suspected:
+                self.suspected.update(chunk)
+                self.lost.append(chunk)  # Lost, not charged until a task crashes a pool on its own
+            elif len(chunk) > 1:
+                half = len(chunk) // 2
+                self.lost.extend((chunk[:half], chunk[half:]))  # Lost again, narrow down the crashing task
+            else:
+                self.suspects.append(chunk[0])  # Lost again on its own, run it alone in the pool
+            return
+        except self.retry_on_exceptions as e:
+            outcomes = [(False, e, time.perf_counter() - submitted)] * len(chunk)  # The whole chunk failed
+        if future is self.isolated:
+            self.isolated = None
+        self.suspected.difference_update(chunk)  # Completed without crashing a worker
+        now = time.perf_counter()
+        for index, (ok, value, latency) in zip(chunk, outcomes):
+            started = now - latency  # Start of the attempt, measured in the worker
+            if not ok:
+                self._failed(index, value, started)
+            elif self.retry.retry_on_result and self.retry.retry_on_result(value):
+                self.attempts[index] += 1  # Increment attempt counter
+                delay = self._next_delay(index, None, value)
+                if delay is None:  # Stop condition met or retries throttled
+                    self._record(index, self.attempts[index], "rejected", None, started, None)
+                    self.results[index] = value  # Stop condition met, keep result
+                    self._finish(index)
+                else:
+                    self.last[index] = (True, value)  # Kept if shutdown fails this task fast
+                    self._schedule(index, delay, "rejected", None, started)
+            else:
+                if self.states is not None:
+                    self.states[index].record_success()  # Close the failure state
+                if self.retry.after:
+                    self.retry.after(self.retry)  # Call after callback if provided
+                self._record(index, self.attempts[index] + 1, "ok", None, started, None)
+                self.results[index] = value
+                self._finish(index)
+
+    def _failed(self, index: int, error: Exception, started: float):
+        if not isinstance(error, self.retry_on_exceptions + (BrokenProcessPool,)):
+            self._record(index, self.attempts[index] + 1, "error", error, started, None)
+            raise error  # Not retryable
+        self.attempts[index] += 1  # Increment attempt counter
+        if self.states is not None:
+            self.states[index].record_failure()  # Count the failure in the failure state
+        delay = self._next_delay(index, error, None)
+        if delay is None:  # Stop condition met or retries throttled
+            self._record(index, self.attempts[index], "error", error, started, None)
+            raise self.retry._give_up(error)  # Reraise the last exception or raise RetryError
+        self.last[index] = (False, error)  # Raised if shutdown fails this task fast
+        self._schedule(index, delay, "error", error, started)
+
+    def _next_delay(self, index: int, error: Optional[Exception], result) -> Optional[float]:
+        """Wait of a task before its next attempt, or None if it stops retrying."""
+        if index in self.final or self.retry.stop_condition(self.attempts[index], error, result):
+            return None
+        return self.retry._next_delay(self.states[index] if self.states is not None else None, self.attempts[index])
+
+    def _schedule(self, index: int, delay: float, outcome: str, error: Optional[Exception], started: float):
+        self._record(index, self.attempts[index], outcome, error, started, delay)
+        if self.retry.before_sleep:
+            self.retry.before_sleep(self.retry)  # Call before sleep callback if provided
+        if index not in self.retrying:
+            self.retrying.add(index)
+            self.retry.shutdown.enter()  # Count this task as in flight until it finishes
+        heapq.heappush(self.delayed, (time.monotonic() + delay, index))
+
+    def _record(self, index: int, attempt: int, outcome: str, error: Optional[Exception], started: float,
+                delay: Optional[float]):
+        trace = self.traces[index] if self.traces is not None else None
+        if trace is not None:
+            trace.record(attempt, outcome, error, started, delay)
+
+    def _finish(self, index: int):
+        if index in self.retrying:
+            self.retrying.discard(index)
+            self.retry.shutdown.exit()  # This task is no longer in flight
+        trace = self.traces[index] if self.traces is not None else None
+        if trace is not None:
+            self.traces[index] = None
+            trace.finish()  # Commit the attempts of the task
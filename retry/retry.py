@@ -1,7 +1,54 @@
+from __future__ import annotations  # Annotations are not evaluated at runtime
 import time
-import asyncio  # Importing asyncio module for asynchronous programming
 import functools  # Importing functools module for higher-order functions
-from typing import Callable, Type, Optional, Tuple, Any  # Importing typing module for type annotations
+TYPE_CHECKING = False  # typing is only needed by type checkers, skipping it keeps imports fast
+if TYPE_CHECKING:
+    from typing import Callable, Type, Optional, Tuple, Any
+    from .attempt_log import AttemptLog
+    from .state import FailureState
+from .shutdown import ShutdownHandle, default_shutdown
+
+
+_EXHAUSTED = object()  # Sentinel marking the end of a wrapped stream
+_CO_COROUTINE = 0x0080  # Code flag of coroutine functions, inspect.CO_COROUTINE
+_CO_ASYNC_GENERATOR = 0x0200  # Code flag of async generator functions, inspect.CO_ASYNC_GENERATOR
+
+
+def _unwrap(func: Callable) -> Callable:
+    """
+    Unwraps bound methods and partials like inspect does.
+    """
+    while True:
+        if hasattr(func, "__func__"):
+            func = func.__func__  # Unwrap bound methods
+        elif isinstance(func, functools.partial):
+            func = func.func  # Unwrap partials
+        else:
+            return func
+
+
+def _has_code_flag(func: Callable, flag: int) -> bool:
+    """
+    Checks a code flag like inspect does, without importing inspect (or asyncio) on the sync path.
+    """
+    code = getattr(_unwrap(func), "__code__", None)
+    return code is not None and bool(code.co_flags & flag)
+
+
+def _is_coroutine_function(func: Callable) -> bool:
+    """
+    Checks for a coroutine function, importing inspect or asyncio only for callables marked as coroutines.
+    """
+    if _has_code_flag(func, _CO_COROUTINE):
+        return True
+    unwrapped = _unwrap(func)
+    if getattr(unwrapped, "_is_coroutine_marker", None) is not None:  # inspect.markcoroutinefunction, 3.12+
+        import inspect
+        return inspect.iscoroutinefunction(func)
+    if getattr(unwrapped, "_is_coroutine", None) is not None:  # Marker set by asyncio based libraries before 3.12
+        import asyncio
+        return asyncio.iscoroutinefunction(func)
+    return False
 
 
 class RetryError(Exception):
@@ -13,6 +60,13 @@ class RetryError(Exception):
         self.last_attempt = last_attempt  # Storing the last attempt when the error occurred
 
 
+class CircuitOpenError(RetryError):
+    """
+    Exception raised without attempting the operation while the failure state of the policy is open.
+    """
+    pass  # last_attempt holds the last exception of the call, or None if no attempt was made
+
+
 class TryAgain(Exception):
     """
     Exception that can be raised to explicitly retry the operation.
@@ -33,6 +87,10 @@ class Retry:
         after: Callable executed after each attempt.
         before_sleep: Callable executed before sleeping between attempts.
         reraise: Boolean indicating whether to reraise the last exception if the stop condition is met.
+        attempt_log: Optional AttemptLog recording every attempt of the decorated calls.
+        failure_state: Optional failure state tracking failures across calls, e.g. FailureState,
+            KeyedFailureState or SharedRetryState.policy().
+        shutdown: ShutdownHandle interrupting waits between attempts. Default: the global default_shutdown handle.
     """
 
     def __init__(self,
@@ -43,7 +101,10 @@ class Retry:
                  before: Optional[Callable] = None,
                  after: Optional[Callable] = None,
                  before_sleep: Optional[Callable] = None,
-                 reraise: bool = False):
+                 reraise: bool = False,
+                 attempt_log: Optional["AttemptLog"] = None,
+                 failure_state: Optional["FailureState"] = None,
+                 shutdown: Optional[ShutdownHandle] = None):
         self.stop_condition = stop_condition if stop_condition is not None else self.default_stop_condition
         self.wait_condition = wait_condition if wait_condition is not None else self.default_wait_condition
         self.retry_on_exceptions = retry_on_exceptions  # Storing the exceptions that trigger a retry
@@ -52,6 +113,9 @@ class Retry:
         self.after = after  # Storing the after attempt callback
         self.before_sleep = before_sleep  # Storing the before sleep callback
         self.reraise = reraise  # Storing the reraise flag
+        self.attempt_log = attempt_log  # Storing the attempt log, None disables recording
+        self.failure_state = failure_state  # Storing the failure state shared across calls
+        self.shutdown = shutdown if shutdown is not None else default_shutdown  # Storing the shutdown handle
 
     def default_stop_condition(self, attempt: int, exception: Optional[Exception], result: Optional[Any]) -> bool:
         """Default stop condition: stops after 3 attempts."""
@@ -65,7 +129,7 @@ class Retry:
         """
         Wraps the function with retry logic.
         """
-        if asyncio.iscoroutinefunction(func):  # Check if the function is asynchronous
+        if _is_coroutine_function(func):  # Check if the function is asynchronous
             @functools.wraps(func)
             async def async_wrapper(*args, **kwargs):
                 return await self._retry_async(func, *args, **kwargs)  # Wrap with async retry logic
@@ -78,69 +142,414 @@ class Retry:
 
             return sync_wrapper  # Return the wrapped sync function
 
+    def stream(self,
+               checkpoint: Optional[Callable[[Any, Any], Any]] = None,
+               start: Any = 0,
+               resume_kwarg: str = "offset"):
+        """
+        Wraps a generator (or async generator) function with resumable retry logic.
+
+        The wrapped producer is called with its current checkpoint passed as the ``resume_kwarg``
+        keyword argument. After every yielded item the checkpoint is advanced, and when the producer
+        fails it is restarted from the last checkpoint, so the consumer sees a single iterator without
+        duplicated items. The attempt counter is reset whenever the producer makes progress.
+
+        Each run of the producer is one attempt for the ``attempt_log`` and the ``failure_state``: a run that
+        fails counts as a failure, a run that delivers an item or ends cleanly counts as a success.
+
+        Args:
+            checkpoint: Callable taking the current checkpoint and the yielded item and returning the new
+                checkpoint (e.g. a cursor or page token). Default: counts the items yielded so far.
+            start: The initial checkpoint passed to the first call of the producer, unless the caller passes
+                its own checkpoint as the ``resume_kwarg`` keyword argument.
+            resume_kwarg: Name of the keyword argument used to pass the checkpoint to the producer.
+        """
+        if checkpoint is None:
+            checkpoint = lambda position, item: position + 1  # Default checkpoint: offset of the next item
+
+        def decorator(func: Callable):
+            if _has_code_flag(func, _CO_ASYNC_GENERATOR):  # Check if the function is an async generator
+                @functools.wraps(func)
+                def async_stream_wrapper(*args, **kwargs):
+                    position = kwargs.pop(resume_kwarg, start)  # The caller's checkpoint takes precedence
+                    return self._stream_async(func, checkpoint, position, resume_kwarg, args, kwargs)
+
+                return async_stream_wrapper  # Return the wrapped async generator function
+
+            @functools.wraps(func)
+            def sync_stream_wrapper(*args, **kwargs):
+                position = kwargs.pop(resume_kwarg, start)  # The caller's checkpoint takes precedence
+                return self._stream_sync(func, checkpoint, position, resume_kwarg, args, kwargs)
+
+            return sync_stream_wrapper  # Return the wrapped generator function
+
+        return decorator
+
+    def map_in_pool(self, func: Callable, items, max_workers: Optional[int] = None, chunksize: int = 1,
+                    mp_context=None) -> list:
+        """
+        Runs a CPU-bound function on every item in a process pool, retrying each task separately.
+
+        A broken pool (e.g. a worker killed by a segfault or the OOM killer) is replaced transparently and only
+        the tasks lost with it are dispatched again. The stop and wait conditions apply to each task, and each task
+        is one call for the callbacks, the failure state and the attempt log.
+
+        Args:
+            func: Picklable callable applied to each item.
+            items: Iterable of items.
+            max_workers: Number of worker processes.
+            chunksize: Number of tasks sent to a worker at once.
+            mp_context: Optional multiprocessing context used to start workers.
+        """
+        from .pool import PoolRunner  # Imported on first use, concurrent.futures is only needed here
+        return PoolRunner(self, func, max_workers, chunksize, mp_context).map(items)
+
     def _retry_sync(self, func: Callable, *args, **kwargs):
         """
         Retry logic for synchronous functions.
         """
         attempt = 0  # Initialize attempt counter
-        while True:
-            try:
-                if self.before:
-                    self.before(self)  # Call before callback if provided
-                result = func(*args, **kwargs)  # Execute the function
-                if self.retry_on_result and self.retry_on_result(result):
+        trace = self.attempt_log.begin(func) if self.attempt_log is not None else None  # Sampled call trace
+        state = self.failure_state.for_call(args, kwargs) if self.failure_state is not None else None  # Call state
+        last_exception = None  # Last exception of this call, reported if the failure state opens
+        final = False  # Set once shutdown interrupted a wait, the next failure stops retrying
+        retrying = False  # Whether this call is counted as in flight by the shutdown handle
+        try:
+            while True:
+                if state is not None and state.is_open():
+                    raise CircuitOpenError(last_exception)  # Fail fast without attempting the operation
+                started = time.perf_counter() if trace is not None else 0.0  # Attempt start, only when traced
+                try:
+                    if self.before:
+                        self.before(self)  # Call before callback if provided
+                    try:
+                        result = func(*args, **kwargs)  # Execute the function
+                    except self.retry_on_exceptions:
+                        raise  # Handled below
+                    except BaseException as e:
+                        if trace is not None:
+                            trace.record(attempt + 1, "error", e, started, None)  # Not retried, the call fails
+                        raise
+                    if self.retry_on_result and self.retry_on_result(result):
+                        attempt += 1  # Increment attempt counter
+                        stop = final or self.stop_condition(attempt, None, result)
+                        delay = None if stop else self._next_delay(state, attempt)  # Compute wait before next attempt
+                        if delay is None:  # Stop condition met or retries throttled
+                            if trace is not None:
+                                trace.record(attempt, "rejected", None, started, None)
+                            return result  # Stop condition met, return result
+                        if trace is not None:
+                            trace.record(attempt, "rejected", None, started, delay)
+                        if self.before_sleep:
+                            self.before_sleep(self)  # Call before sleep callback if provided
+                        if not retrying:
+                            retrying = True
+                            self.shutdown.enter()  # Count this call as in flight until it returns
+                        if self.shutdown.wait(delay):  # Wait before next attempt, woken early by shutdown
+                            if not self.shutdown.final_attempt:
+                                return result  # Fail fast, return result
+                            final = True  # Run one final attempt
+                    else:
+                        if state is not None:
+                            state.record_success()  # Close the failure state
+                        if self.after:
+                            self.after(self)  # Call after callback if provided
+                        if trace is not None:
+                            trace.record(attempt + 1, "ok", None, started, None)  # Last record of the call
+                        return result  # Return result if no retry needed
+                except self.retry_on_exceptions as e:
                     attempt += 1  # Increment attempt counter
-                    if self.stop_condition(attempt, None, result):
-                        return result  # Stop condition met, return result
+                    last_exception = e  # Remember the failure for CircuitOpenError
+                    if state is not None:
+                        state.record_failure()  # Count the failure in the failure state
+                    stop = final or self.stop_condition(attempt, e, None)
+                    delay = None if stop else self._next_delay(state, attempt)  # Compute wait before next attempt
+                    if delay is None:  # Stop condition met or retries throttled
+                        if trace is not None:
+                            trace.record(attempt, "error", e, started, None)
+                        if self.reraise:
+                            raise e  # Reraise the last exception
+                        else:
+                            raise RetryError(e)  # Raise RetryError with the last exception
+                    if trace is not None:
+                        trace.record(attempt, "error", e, started, delay)
                     if self.before_sleep:
                         self.before_sleep(self)  # Call before sleep callback if provided
-                    time.sleep(self.wait_condition(attempt))  # Wait before next attempt
-                else:
-                    if self.after:
-                        self.after(self)  # Call after callback if provided
-                    return result  # Return result if no retry needed
-            except self.retry_on_exceptions as e:
-                attempt += 1  # Increment attempt counter
-                if self.stop_condition(attempt, e, None):
-                    if self.reraise:
-                        raise e  # Reraise the last exception
-                    else:
-                        raise RetryError(e)  # Raise RetryError with the last exception
-                if self.before_sleep:
-                    self.before_sleep(self)  # Call before sleep callback if provided
-                time.sleep(self.wait_condition(attempt))  # Wait before next attempt
+                    if not retrying:
+                        retrying = True
+                        self.shutdown.enter()  # Count this call as in flight until it returns
+                    if self.shutdown.wait(delay):  # Wait before next attempt, woken early by shutdown
+                        if not self.shutdown.final_attempt:
+                            raise self._give_up(e)  # Fail fast with the last exception
+                        final = True  # Run one final attempt
+        finally:
+            if trace is not None:
+                trace.finish()  # Commit the attempts of the call, however it ended
+            if retrying:
+                self.shutdown.exit()  # This call is no longer in flight
 
     async def _retry_async(self, func: Callable, *args, **kwargs):
         """
         Retry logic for asynchronous functions.
         """
         attempt = 0  # Initialize attempt counter
-        while True:
-            try:
-                if self.before:
-                    self.before(self)  # Call before callback if provided
-                result = await func(*args, **kwargs)  # Execute the async function
-                if self.retry_on_result and self.retry_on_result(result):
+        trace = self.attempt_log.begin(func) if self.attempt_log is not None else None  # Sampled call trace
+        state = self.failure_state.for_call(args, kwargs) if self.failure_state is not None else None  # Call state
+        last_exception = None  # Last exception of this call, reported if the failure state opens
+        final = False  # Set once shutdown interrupted a wait, the next failure stops retrying
+        retrying = False  # Whether this call is counted as in flight by the shutdown handle
+        try:
+            while True:
+                if state is not None and state.is_open():
+                    raise CircuitOpenError(last_exception)  # Fail fast without attempting the operation
+                started = time.perf_counter() if trace is not None else 0.0  # Attempt start, only when traced
+                try:
+                    if self.before:
+                        self.before(self)  # Call before callback if provided
+                    try:
+                        result = await func(*args, **kwargs)  # Execute the async function
+                    except self.retry_on_exceptions:
+                        raise  # Handled below
+                    except BaseException as e:
+                        if trace is not None:
+                            trace.record(attempt + 1, "error", e, started, None)  # Not retried, the call fails
+                        raise
+                    if self.retry_on_result and self.retry_on_result(result):
+                        attempt += 1  # Increment attempt counter
+                        stop = final or self.stop_condition(attempt, None, result)
+                        delay = None if stop else self._next_delay(state, attempt)  # Compute wait before next attempt
+                        if delay is None:  # Stop condition met or retries throttled
+                            if trace is not None:
+                                trace.record(attempt, "rejected", None, started, None)
+                            return result  # Stop condition met, return result
+                        if trace is not None:
+                            trace.record(attempt, "rejected", None, started, delay)
+                        if self.before_sleep:
+                            self.before_sleep(self)  # Call before sleep callback if provided
+                        if not retrying:
+                            retrying = True
+                            self.shutdown.enter()  # Count this call as in flight until it returns
+                        if await self.shutdown.wait_async(delay):  # Wait before next attempt, woken early by shutdown
+                            if not self.shutdown.final_attempt:
+                                return result  # Fail fast, return result
+                            final = True  # Run one final attempt
+                    else:
+                        if state is not None:
+                            state.record_success()  # Close the failure state
+                        if self.after:
+                            self.after(self)  # Call after callback if provided
+                        if trace is not None:
+                            trace.record(attempt + 1, "ok", None, started, None)  # Last record of the call
+                        return result  # Return result if no retry needed
+                except self.retry_on_exceptions as e:
+                    attempt += 1  # Increment attempt counter
+                    last_exception = e  # Remember the failure for CircuitOpenError
+                    if state is not None:
+                        state.record_failure()  # Count the failure in the failure state
+                    stop = final or self.stop_condition(attempt, e, None)
+                    delay = None if stop else self._next_delay(state, attempt)  # Compute wait before next attempt
+                    if delay is None:  # Stop condition met or retries throttled
+                        if trace is not None:
+                            trace.record(attempt, "error", e, started, None)
+                        if self.reraise:
+                            raise e  # Reraise the last exception
+                        else:
+                            raise RetryError(e)  # Raise RetryError with the last exception
+                    if trace is not None:
+                        trace.record(attempt, "error", e, started, delay)
+                    if self.before_sleep:
+                        self.before_sleep(self)  # Call before sleep callback if provided
+                    if not retrying:
+                        retrying = True
+                        self.shutdown.enter()  # Count this call as in flight until it returns
+                    if await self.shutdown.wait_async(delay):  # Wait before next attempt, woken early by shutdown
+                        if not self.shutdown.final_attempt:
+                            raise self._give_up(e)  # Fail fast with the last exception
+                        final = True  # Run one final attempt
+        finally:
+            if trace is not None:
+                trace.finish()  # Commit the attempts of the call, however it ended
+            if retrying:
+                self.shutdown.exit()  # This call is no longer in flight
+
+    def _stream_sync(self, func: Callable, checkpoint: Callable, position: Any, resume_kwarg: str,
+                     args: tuple, kwargs: dict):
+        """
+        Resumable retry logic for generator functions.
+        """
+        attempt = 0  # Initialize attempt counter
+        iterator = None  # The currently running producer, restarted after each failure
+        trace = self.attempt_log.begin(func) if self.attempt_log is not None else None  # Sampled call trace
+        state = self.failure_state.for_call(args, kwargs) if self.failure_state is not None else None  # Call state
+        last_exception = None  # Last exception of this stream, reported if the failure state opens
+        started = 0.0  # Start of the running producer, only when traced
+        delivered = False  # Whether the running producer has delivered an item
+        final = False  # Set once shutdown interrupted a wait, the next failure stops retrying
+        retrying = False  # Whether this stream is counted as in flight by the shutdown handle
+        try:
+            while True:
+                if iterator is None:
+                    if state is not None and state.is_open():
+                        raise CircuitOpenError(last_exception)  # Fail fast without restarting the producer
+                    started = time.perf_counter() if trace is not None else 0.0  # Attempt start, only when traced
+                    delivered = False
+                try:
+                    if iterator is None:
+                        if self.before:
+                            self.before(self)  # Call before callback if provided
+                        iterator = iter(func(*args, **dict(kwargs, **{resume_kwarg: position})))  # Resume producer
+                    item = next(iterator, _EXHAUSTED)  # Fetch the next item from the producer
+                except self.retry_on_exceptions as e:
+                    iterator = None  # Discard the failed producer
                     attempt += 1  # Increment attempt counter
-                    if self.stop_condition(attempt, None, result):
-                        return result  # Stop condition met, return result
+                    last_exception = e  # Remember the failure for CircuitOpenError
+                    if state is not None:
+                        state.record_failure()  # Count the failure in the failure state
+                    stop = final or self.stop_condition(attempt, e, None)
+                    delay = None if stop else self._next_delay(state, attempt)  # Compute wait before next attempt
+                    if delay is None:  # Stop condition met or retries throttled
+                        if trace is not None:
+                            trace.record(attempt, "error", e, started, None)
+                        if self.reraise:
+                            raise e  # Reraise the last exception
+                        else:
+                            raise RetryError(e)  # Raise RetryError with the last exception
+                    if trace is not None:
+                        trace.record(attempt, "error", e, started, delay)
                     if self.before_sleep:
                         self.before_sleep(self)  # Call before sleep callback if provided
-                    await asyncio.sleep(self.wait_condition(attempt))  # Wait before next attempt
-                else:
+                    if not retrying:
+                        retrying = True
+                        self.shutdown.enter()  # Count this stream as in flight until it makes progress
+                    if self.shutdown.wait(delay):  # Wait before next attempt, woken early by shutdown
+                        if not self.shutdown.final_attempt:
+                            raise self._give_up(e)  # Fail fast with the last exception
+                        final = True  # Run one final attempt
+                    continue
+                except BaseException as e:
+                    if trace is not None:
+                        trace.record(attempt + 1, "error", e, started, None)  # Not retried, the stream fails
+                    raise
+                if state is not None and not delivered:
+                    state.record_success()  # The producer delivered again, close the failure state
+                delivered = True
+                if item is _EXHAUSTED:
                     if self.after:
                         self.after(self)  # Call after callback if provided
-                    return result  # Return result if no retry needed
-            except self.retry_on_exceptions as e:
-                attempt += 1  # Increment attempt counter
-                if self.stop_condition(attempt, e, None):
-                    if self.reraise:
-                        raise e  # Reraise the last exception
-                    else:
-                        raise RetryError(e)  # Raise RetryError with the last exception
-                if self.before_sleep:
-                    self.before_sleep(self)  # Call before sleep callback if provided
-                await asyncio.sleep(self.wait_condition(attempt))  # Wait before next attempt
+                    if trace is not None:
+                        trace.record(attempt + 1, "ok", None, started, None)  # Last record of the stream
+                    return
+                position = checkpoint(position, item)  # Advance the checkpoint past the delivered item
+                attempt = 0  # Progress was made, reset attempt counter
+                if retrying:
+                    retrying = False
+                    self.shutdown.exit()  # Recovered, no longer in flight
+                yield item
+        finally:
+            if trace is not None:
+                trace.finish()  # Commit the attempts of the stream, however it ended
+            if retrying:
+                self.shutdown.exit()  # This stream is no longer in flight
+            if iterator is not None and hasattr(iterator, "close"):
+                iterator.close()  # Close the producer if the consumer stops early
+
+    async def _stream_async(self, func: Callable, checkpoint: Callable, position: Any, resume_kwarg: str,
+                            args: tuple, kwargs: dict):
+        """
+        Resumable retry logic for async generator functions.
+        """
+        attempt = 0  # Initialize attempt counter
+        iterator = None  # The currently running producer, restarted after each failure
+        trace = self.attempt_log.begin(func) if self.attempt_log is not None else None  # Sampled call trace
+        state = self.failure_state.for_call(args, kwargs) if self.failure_state is not None else None  # Call state
+        last_exception = None  # Last exception of this stream, reported if the failure state opens
+        started = 0.0  # Start of the running producer, only when traced
+        delivered = False  # Whether the running producer has delivered an item
+        final = False  # Set once shutdown interrupted a wait, the next failure stops retrying
+        retrying = False  # Whether this stream is counted as in flight by the shutdown handle
+        try:
+            while True:
+                if iterator is None:
+                    if state is not None and state.is_open():
+                        raise CircuitOpenError(last_exception)  # Fail fast without restarting the producer
+                    started = time.perf_counter() if trace is not None else 0.0  # Attempt start, only when traced
+                    delivered = False
+                try:
+                    if iterator is None:
+                        if self.before:
+                            self.before(self)  # Call before callback if provided
+                        iterator = func(*args, **dict(kwargs, **{resume_kwarg: position})).__aiter__()  # Resume producer
+                    item = await iterator.__anext__()  # Fetch the next item from the producer
+                except StopAsyncIteration:
+                    iterator = None  # The producer is exhausted
+                    if state is not None and not delivered:
+                        state.record_success()  # The producer delivered again, close the failure state
+                    if self.after:
+                        self.after(self)  # Call after callback if provided
+                    if trace is not None:
+                        trace.record(attempt + 1, "ok", None, started, None)  # Last record of the stream
+                    return
+                except self.retry_on_exceptions as e:
+                    iterator = None  # Discard the failed producer
+                    attempt += 1  # Increment attempt counter
+                    last_exception = e  # Remember the failure for CircuitOpenError
+                    if state is not None:
+                        state.record_failure()  # Count the failure in the failure state
+                    stop = final or self.stop_condition(attempt, e, None)
+                    delay = None if stop else self._next_delay(state, attempt)  # Compute wait before next attempt
+                    if delay is None:  # Stop condition met or retries throttled
+                        if trace is not None:
+                            trace.record(attempt, "error", e, started, None)
+                        if self.reraise:
+                            raise e  # Reraise the last exception
+                        else:
+                            raise RetryError(e)  # Raise RetryError with the last exception
+                    if trace is not None:
+                        trace.record(attempt, "error", e, started, delay)
+                    if self.before_sleep:
+                        self.before_sleep(self)  # Call before sleep callback if provided
+                    if not retrying:
+                        retrying = True
+                        self.shutdown.enter()  # Count this stream as in flight until it makes progress
+                    if await self.shutdown.wait_async(delay):  # Wait before next attempt, woken early by shutdown
+                        if not self.shutdown.final_attempt:
+                            raise self._give_up(e)  # Fail fast with the last exception
+                        final = True  # Run one final attempt
+                    continue
+                except BaseException as e:
+                    if trace is not None:
+                        trace.record(attempt + 1, "error", e, started, None)  # Not retried, the stream fails
+                    raise
+                if state is not None and not delivered:
+                    state.record_success()  # The producer delivered again, close the failure state
+                delivered = True
+                position = checkpoint(position, item)  # Advance the checkpoint past the delivered item
+                attempt = 0  # Progress was made, reset attempt counter
+                if retrying:
+                    retrying = False
+                    self.shutdown.exit()  # Recovered, no longer in flight
+                yield item
+        finally:
+            if trace is not None:
+                trace.finish()  # Commit the attempts of the stream, however it ended
+            if retrying:
+                self.shutdown.exit()  # This stream is no longer in flight
+            if iterator is not None and hasattr(iterator, "aclose"):
+                await iterator.aclose()  # Close the producer if the consumer stops early
+
+    def _next_delay(self, state, attempt: int) -> Optional[float]:
+        """
+        Returns the wait before the attempt after ``attempt``, or None if the failure state throttles retries.
+        """
+        if state is None:
+            return self.wait_condition(attempt)
+        return state.retry_delay(self.wait_condition, attempt)  # The state may continue its own backoff
+
+    def _give_up(self, e: Exception) -> Exception:
+        """
+        Returns the exception raised when retrying stops after the exception ``e``.
+        """
+        return e if self.reraise else RetryError(e)
 
     def __enter__(self):
         """
@@ -0,0 +1,250 @@
+import os
+import mmap
+import time
+import struct
+import hashlib
+import threading
+from typing import Optional
+
+try:
+    import fcntl  # POSIX record locks, used to serialize writers across processes
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+_HEADER = struct.Struct("<8sQ")  # Magic, number of slots, stored in the first cache line of the file
+_MAGIC = b"RETRYSHM"
+_DEFAULT_SLOTS = 64
+_SEQUENCE = struct.Struct("<Q")  # Seqlock sequence number, odd while a writer is updating the slot
+_FIELDS = struct.Struct("<Qqqdd")  # Policy key, consecutive failures, total failures, opened at, last failure
+_SLOT_SIZE = 64  # Slot size in bytes, one cache line per policy
+_READ_SPINS = 100  # Lock-free read attempts before falling back to the record lock
+
+
+def _policy_key(name: str) -> int:
+    """Stable 64-bit key of a policy name, identical in every process."""
+    key = int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+    return key or 1  # Zero marks an empty slot
+
+
+class SharedRetryState:
+    """
+    Failure counters and open/closed flags shared by all processes on a host through an mmap'd file.
+
+    Create it before forking workers, or open the same ``path`` in every process. The number of slots is stored in
+    the file, so every process maps the policies to the same slots. Reads are lock-free
+    (seqlock); writes are serialized with a POSIX record lock on the slot being updated. On platforms
+    without ``fcntl`` writes are only serialized within the process.
+
+    When all slots are taken, the slot of a closed policy without consecutive failures is recycled, or else
+    the slot with the oldest last failure. A recycled policy starts again from a closed state with no failures.
+
+    Args:
+        path: File backing the shared memory. Created if it does not exist.
+        slots: Maximum number of policies tracked at the same time, 64 for a new file. Default: the number
+            stored in an existing file. Raises ValueError if it differs from the number stored in the file.
+    """
+
+    def __init__(self, path: str, slots: Optional[int] = None):
+        self.path = path
+        self._lock = threading.Lock()  # Record locks are per process, threads need their own lock
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self.slots = self._open_header(slots)
+            self._mmap = mmap.mmap(self._fd, (self.slots + 1) * _SLOT_SIZE)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _open_header(self, slots: Optional[int]) -> int:
+        """Writes the header of a new file, or checks the header of an existing one, and returns the slot count."""
+        with self._locked(0, _SLOT_SIZE):
+            header = os.read(self._fd, _HEADER.size)
+            if not header:
+                slots = slots or _DEFAULT_SLOTS
+                os.write(self._fd, _HEADER.pack(_MAGIC, slots))  # New file, written before any slot is used
+            else:
+                magic, stored = _HEADER.unpack(header.ljust(_HEADER.size, b"\0"))
+                if magic != _MAGIC:
+                    raise ValueError("{} is not a shared retry state file".format(self.path))
+                if slots is not None and slots != stored:
+                    raise ValueError("{} has {} slots, not {}".format(self.path, stored, slots))
+                slots = stored
+            size = (slots + 1) * _SLOT_SIZE  # Header, then one cache line per slot
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            return slots
+
+    def policy(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> "SharedPolicyState":
+        """
+        Returns the shared state of a policy, claiming a slot for it on first use.
+
+        Args:
+            name: Name identifying the policy in every process.
+            failure_threshold: Consecutive failures after which the policy is opened.
+            reset_timeout: Seconds the policy stays open before attempts are allowed again.
+        """
+        key = _policy_key(name)
+        return SharedPolicyState(self, key, self._claim(key), failure_threshold, reset_timeout)
+
+    def close(self):
+        """Unmaps the shared memory and closes the backing file."""
+        self._mmap.close()
+        os.close(self._fd)
+
+    def _claim(self, key: int) -> int:
+        """Finds the slot of a key, claiming an empty one with linear probing or recycling the least useful one."""
+        start = key % self.slots
+        with self._locked(_SLOT_SIZE, self.slots * _SLOT_SIZE):
+            recycle, recycle_rank = None, None
+            for probe in range(self.slots):
+                index = (start + probe) % self.slots
+                slot_key, consecutive, _, _, last_failure_at = self._read_locked(index)
+                if slot_key == key:
+                    return index
+                if slot_key == 0:
+                    recycle = index
+                    break  # Keys are never stored past an empty slot
+                rank = (consecutive > 0, last_failure_at)  # Prefer slots without failures, then the oldest failure
+                if recycle_rank is None or rank < recycle_rank:
+                    recycle, recycle_rank = index, rank
+            self._write(recycle, (key, 0, 0, 0.0, 0.0))
+            return recycle
+
+    def read(self, index: int) -> tuple:
+        """Lock-free read of a slot, falling back to the record lock if a writer keeps it busy."""
+        offset = self._offset(index)
+        for _ in range(_READ_SPINS):
+            sequence = _SEQUENCE.unpack_from(self._mmap, offset)[0]
+            if sequence & 1:
+                continue  # Writer in progress
+            fields = _FIELDS.unpack_from(self._mmap, offset + _SEQUENCE.size)
+            if _SEQUENCE.unpack_from(self._mmap, offset)[0] == sequence:
+                return fields
+        with self._locked(offset, _SLOT_SIZE):
+            return self._read_locked(index)  # The writer finished or died, its record lock is released
+
+    def update(self, index: int, update) -> tuple:
+        """Atomically replaces the fields of a slot with ``update(fields)`` and returns the new fields."""
+        offset = self._offset(index)
+        with self._locked(offset, _SLOT_SIZE):
+            fields = update(self._read_locked(index))
+            self._write(index, fields)
+        return fields
+
+    def _read_locked(self, index: int) -> tuple:
+        """Reads a slot while holding its record lock, repairing the sequence left odd by a dead writer."""
+        offset = self._offset(index)
+        sequence = _SEQUENCE.unpack_from(self._mmap, offset)[0]
+        if sequence & 1:
+            _SEQUENCE.pack_into(self._mmap, offset, sequence + 1)
+        return _FIELDS.unpack_from(self._mmap, offset + _SEQUENCE.size)
+
+    def _write(self, index: int, fields: tuple):
+        """Writes a slot while holding its record lock. The sequence is set to absolute odd and even values,
+        so a writer killed mid-write cannot leave the parity flipped."""
+        offset = self._offset(index)
+        sequence = _SEQUENCE.unpack_from(self._mmap, offset)[0] | 1
+        _SEQUENCE.pack_into(self._mmap, offset, sequence)
+        _FIELDS.pack_into(self._mmap, offset + _SEQUENCE.size, *fields)
+        _SEQUENCE.pack_into(self._mmap, offset, sequence + 1)
+
+    def _offset(self, index: int) -> int:
+        return (index + 1) * _SLOT_SIZE  # Slots follow the header
+
+    def _locked(self, offset: int, length: int):
+        return _RecordLock(self._lock, self._fd if fcntl is not None else None, offset, length)
+
+
+class _RecordLock:
+    """
+    Context manager holding the thread lock and, where available, a POSIX record lock on a byte range.
+    """
+    __slots__ = ("lock", "fd", "offset", "length")
+
+    def __init__(self, lock: threading.Lock, fd, offset: int, length: int):
+        self.lock = lock
+        self.fd = fd
+        self.offset = offset
+        self.length = length
+
+    def __enter__(self):
+        self.lock.acquire()
+        if self.fd is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, self.length, self.offset)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.fd is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, self.length, self.offset)
+        self.lock.release()
+
+
+class SharedPolicyState:
+    """
+    Failure tracking of one policy in a SharedRetryState, passed to Retry as ``failure_state``.
+
+    The policy opens after ``failure_threshold`` consecutive failures in any process. While open, every
+    process fails fast with CircuitOpenError; after ``reset_timeout`` seconds attempts are allowed again,
+    a success closes the policy and a failure opens it for another ``reset_timeout``.
+    """
+
+    def __init__(self, shared: SharedRetryState, key: int, index: int, failure_threshold: int,
+                 reset_timeout: float):
+        self.shared = shared
+        self.key = key
+        self.index = index
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    def for_call(self, args: tuple, kwargs: dict) -> "SharedPolicyState":
+        """Returns the state used for a call, the same state for every call."""
+        return self
+
+    @property
+    def failures(self) -> int:
+        """Consecutive failures seen by all processes."""
+        return self._read()[1]
+
+    @property
+    def total_failures(self) -> int:
+        """Total failures seen by all processes."""
+        return self._read()[2]
+
+    def is_open(self) -> bool:
+        """Returns True while attempts should fail fast."""
+        opened_at = self._read()[3]
+        return opened_at > 0 and time.time() - opened_at < self.reset_timeout
+
+    def record_failure(self):
+        """Counts a failed attempt, opening the policy once the threshold is reached."""
+        def update(fields):
+            key, consecutive, total, opened_at, _ = fields
+            now = time.time()
+            consecutive += 1
+            if consecutive >= self.failure_threshold:
+                opened_at = now
+            return key, consecutive, total + 1, opened_at, now
+
+        self._update(update)
+
+    def record_success(self):
+        """Closes the policy and resets the consecutive failure counter."""
+        if self._read()[1] == 0:
+            return  # Already closed, skip the write lock
+        self._update(lambda fields: (fields[0], 0, fields[2], 0.0, fields[4]))
+
+    def retry_delay(self, wait_condition, attempt: int) -> float:
+        """Returns the wait before retrying after ``attempt``, shared policies do not throttle retries."""
+        return wait_condition(attempt)
+
+    def _read(self) -> tuple:
+        """Reads the policy, as a closed policy without failures if its slot was recycled."""
+        fields = self.shared.read(self.index)
+        return fields if fields[0] == self.key else (self.key, 0, 0, 0.0, 0.0)
+
+    def _update(self, update):
+        """Updates the policy, claiming a slot again if its slot was recycled for another policy."""
+        while True:
+            fields = self.shared.update(self.index, lambda fields: update(fields) if fields[0] == self.key else fields)
+            if fields[0] == self.key:
+                return
+            self.index = self.shared._claim(self.key)
@@ -0,0 +1,97 @@
+import threading
+
+
+class ShutdownHandle:
+    """
+    Wakes every retry sleeping on this handle so shutdown time is bounded.
+
+    Retry sleeps between attempts on its ``shutdown`` handle (``default_shutdown`` unless another handle is
+    given) instead of ``time.sleep``. Once the handle is triggered, sleeping retries wake immediately and
+    retries that fail afterwards do not sleep at all: they either stop as if the stop condition was met, or
+    run one final attempt first when ``final_attempt`` is True.
+
+    Args:
+        final_attempt: Whether interrupted retries run one final attempt instead of failing fast.
+    """
+
+    def __init__(self, final_attempt: bool = False):
+        self.final_attempt = final_attempt
+        self._event = threading.Event()
+        self._condition = threading.Condition()
+        self._in_flight = 0  # Calls that have failed at least once and have not returned yet
+        self._async_waiters = set()  # (loop, future) pairs of sleeping coroutines
+
+    @property
+    def in_flight(self) -> int:
+        """Number of retrying calls that have not finished yet."""
+        return self._in_flight
+
+    def is_set(self) -> bool:
+        """Returns True once shutdown has been triggered."""
+        return self._event.is_set()
+
+    def trigger(self) -> int:
+        """
+        Triggers shutdown, waking every sleeping retry, and returns the number of retries in flight.
+        """
+        with self._condition:
+            self._event.set()
+            waiters = list(self._async_waiters)
+            in_flight = self._in_flight
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+        return in_flight
+
+    def drain(self, timeout: float = None) -> bool:
+        """
+        Waits until no retry is in flight and returns False if ``timeout`` expired first.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def reset(self):
+        """Clears the shutdown flag, e.g. after a shutdown was aborted."""
+        self._event.clear()
+
+    def wait(self, delay: float) -> bool:
+        """Sleeps for ``delay`` seconds and returns True if woken by shutdown."""
+        return self._event.wait(delay)
+
+    async def wait_async(self, delay: float) -> bool:
+        """Sleeps for ``delay`` seconds in the running event loop and returns True if woken by shutdown."""
+        import asyncio
+        loop = asyncio.get_event_loop()
+        waiter = loop.create_future()
+        entry = (loop, waiter)
+        with self._condition:
+            if self._event.is_set():
+                return True
+            self._async_waiters.add(entry)
+        try:
+            await asyncio.wait_for(waiter, delay)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._condition:
+                self._async_waiters.discard(entry)
+
+    def enter(self):
+        """Marks a call as retrying, counted in ``in_flight`` until ``exit`` is called."""
+        with self._condition:
+            self._in_flight += 1
+
+    def exit(self):
+        """Marks a retrying call as finished."""
+        with self._condition:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._condition.notify_all()
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+default_shutdown = ShutdownHandle()  # Handle used by every Retry without its own shutdown handle
@@ -0,0 +1,149 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+class FailureState:
+    """
+    In-process failure tracking of a policy, passed to Retry as ``failure_state``.
+
+    The state opens after ``failure_threshold`` consecutive failures. While open, calls fail fast with
+    CircuitOpenError; after ``reset_timeout`` seconds attempts are allowed again, a success closes the state
+    and a failure opens it for another ``reset_timeout``.
+
+    With ``backoff_history`` the wait before a retry is computed from the consecutive failures of the state
+    instead of the attempts of the call, so calls keep backing off where earlier calls stopped. With
+    ``max_tokens`` retries are throttled like gRPC retry throttling: every failure takes a token, every success
+    returns ``token_ratio`` tokens, and retries are only made while more than half of the tokens are left.
+    The state is safe to share between threads.
+
+    Args:
+        failure_threshold: Consecutive failures after which the state is opened.
+        reset_timeout: Seconds the state stays open before attempts are allowed again.
+        backoff_history: Whether waits continue from the consecutive failures of earlier calls.
+        max_tokens: Size of the retry token bucket, or None to never throttle retries.
+        token_ratio: Tokens returned to the bucket by every success.
+    """
+    __slots__ = ("failure_threshold", "reset_timeout", "backoff_history", "max_tokens", "token_ratio", "failures",
+                 "total_failures", "last_failure_at", "opened_at", "tokens", "_lock")
+
+    def __init__(self,
+                 failure_threshold: int = 5,
+                 reset_timeout: float = 30.0,
+                 backoff_history: bool = False,
+                 max_tokens: Optional[float] = None,
+                 token_ratio: float = 0.1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.backoff_history = backoff_history
+        self.max_tokens = max_tokens
+        self.token_ratio = token_ratio
+        self.failures = 0  # Consecutive failures
+        self.total_failures = 0  # Total failures
+        self.last_failure_at = 0.0  # Time of the last failure, 0 if none
+        self.opened_at = 0.0  # Time the state was opened, 0 while closed
+        self.tokens = max_tokens  # Retry tokens left, None without throttling
+        self._lock = threading.Lock()  # Serializes updates from concurrent calls
+
+    def for_call(self, args: tuple, kwargs: dict) -> "FailureState":
+        """Returns the state used for a call, the same state for every call."""
+        return self
+
+    def is_open(self) -> bool:
+        """Returns True while attempts should fail fast."""
+        return self.opened_at > 0 and time.time() - self.opened_at < self.reset_timeout
+
+    def record_failure(self):
+        """Counts a failed attempt, opening the state once the threshold is reached."""
+        with self._lock:
+            self.failures += 1
+            self.total_failures += 1
+            self.last_failure_at = time.time()
+            if self.failures >= self.failure_threshold:
+                self.opened_at = self.last_failure_at
+            if self.tokens is not None:
+                self.tokens = max(0.0, self.tokens - 1)
+
+    def record_success(self):
+        """Closes the state and resets the consecutive failure counter."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = 0.0
+            if self.tokens is not None:
+                self.tokens = min(self.max_tokens, self.tokens + self.token_ratio)
+
+    def retry_delay(self, wait_condition: Callable[[int], float], attempt: int) -> Optional[float]:
+        """Returns the wait before retrying after ``attempt``, or None while retries are throttled."""
+        with self._lock:
+            if self.tokens is not None and self.tokens <= self.max_tokens / 2:
+                return None  # Throttled, too many recent failures
+            if self.backoff_history:
+                attempt = max(attempt, self.failures)  # Continue backing off from earlier calls
+        return wait_condition(attempt)
+
+
+class KeyedFailureState:
+    """
+    Failure states kept per key, so that failures, backoff history and retry throttling of one shard or host
+    do not affect the others.
+
+    The key of a call is computed by ``key_func`` from the call arguments. States are kept in a table bounded
+    to ``maxsize`` entries; the least recently used entry is evicted first, and entries unused for ``ttl``
+    seconds expire. Lookups and evictions are O(1).
+
+    Args:
+        key_func: Callable receiving the call arguments and returning the key of the call.
+        factory: Callable receiving a key and returning a new state. Default: FailureState().
+        maxsize: Maximum number of keys tracked.
+        ttl: Seconds after which an unused key is dropped, or None to only evict by size.
+    """
+
+    def __init__(self,
+                 key_func: Callable[..., Any],
+                 factory: Optional[Callable[[Any], Any]] = None,
+                 maxsize: int = 10000,
+                 ttl: Optional[float] = None):
+        self.key_func = key_func
+        self.factory = factory if factory is not None else lambda key: FailureState()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # Key -> (last used, state), least recently used first
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def for_call(self, args: tuple, kwargs: dict):
+        """Returns the state of the key computed from the call arguments."""
+        return self.get(self.key_func(*args, **kwargs))
+
+    def get(self, key):
+        """Returns the state of a key, creating it if it is not tracked or has expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or now - entry[0] < self.ttl):
+                self._entries[key] = (now, entry[1])
+                self._entries.move_to_end(key)  # Mark as most recently used
+                return entry[1]
+            state = self.factory(key)
+            self._entries[key] = (now, state)
+            self._entries.move_to_end(key)
+            self._evict(now)
+            return state
+
+    def _evict(self, now: float):
+        """Drops expired entries and the least recently used entries above ``maxsize``."""
+        entries = self._entries
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        if self.ttl is not None:
+            while entries:
+                last_used = next(iter(entries.values()))[0]
+                if now - last_used < self.ttl:
+                    break  # Entries are ordered by last use, the rest are fresh
+                entries.popitem(last=False)
@@ -0,0 +1,18 @@
+import pytest
+
+
+# Factory of functions failing a given number of times before succeeding
+@pytest.fixture
+def make_flaky():
+    def factory(failures):
+        state = {"calls": 0}
+
+        def flaky():
+            state["calls"] += 1
+            if state["calls"] <= failures:
+                raise ValueError("Simulated transient error.")
+            return "Success"
+
+        return flaky
+
+    return factory
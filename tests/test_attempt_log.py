@@ -0,0 +1,160 @@
+import io
+import json
+import asyncio
+import pytest
+from retry import (
+    Retry, RetryError, CircuitOpenError, AttemptLog, AttemptExporter, FailureState, JsonLinesExporter,
+    SpanExporter, stop_after_attempt, wait_fixed
+)
+
+
+# Test every attempt is recorded with its outcome and chosen delay
+def test_attempt_log_records_attempts(make_flaky):
+    log = AttemptLog(capacity=16)
+    func = Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0), attempt_log=log)(make_flaky(2))
+    assert func() == "Success"
+    records = log.snapshot()
+    assert [(r.attempt, r.outcome, r.exception, r.delay) for r in records] == [
+        (1, "error", "ValueError", 0), (2, "error", "ValueError", 0), (3, "ok", None, None)
+    ]
+    assert len({r.call_id for r in records}) == 1
+    assert all(r.latency >= 0 for r in records)
+
+
+# Test the ring buffer keeps only the newest records
+def test_attempt_log_capacity(make_flaky):
+    log = AttemptLog(capacity=2)
+    func = Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0), attempt_log=log)(make_flaky(5))
+    with pytest.raises(RetryError):
+        func()
+    assert [r.attempt for r in log.snapshot()] == [2, 3]
+
+
+# Test head sampling skips unsampled calls entirely
+def test_attempt_log_head_sampling():
+    log = AttemptLog(sample_rate=0.5, rng=lambda: 0.9)
+    Retry(attempt_log=log)(lambda: "Success")()
+    assert log.snapshot() == []
+
+
+# Test tail sampling keeps calls that needed a retry
+def test_attempt_log_tail_sampling(make_flaky):
+    log = AttemptLog(sample_rate=0.0, sampling="tail")
+    retry = Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0), attempt_log=log)
+    retry(lambda: "Success")()
+    assert log.snapshot() == []
+    retry(make_flaky(1))()
+    assert [r.outcome for r in log.snapshot()] == ["error", "ok"]
+
+
+# Test flushing exports JSON lines in batches
+def test_attempt_log_json_lines_export(make_flaky):
+    stream = io.StringIO()
+    log = AttemptLog(exporter=JsonLinesExporter(stream), batch_size=2)
+    Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0), attempt_log=log)(make_flaky(2))()
+    assert log.flush() == 3
+    assert log.snapshot() == []
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["attempt"] for line in lines] == [1, 2, 3]
+
+
+# Test records are turned into spans
+def test_attempt_log_span_export(make_flaky):
+    spans = []
+
+    class Span:
+        def __init__(self, name, start_time, attributes):
+            self.name, self.start_time, self.attributes = name, start_time, attributes
+
+        def end(self, end_time):
+            self.end_time = end_time
+            spans.append(self)
+
+    class Tracer:
+        def start_span(self, name, start_time=None, attributes=None):
+            return Span(name, start_time, attributes)
+
+    log = AttemptLog(exporter=SpanExporter(Tracer()))
+    Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0), attempt_log=log)(make_flaky(1))()
+    log.flush()
+    assert [span.attributes["retry.outcome"] for span in spans] == ["error", "ok"]
+    assert spans[0].attributes["retry.exception"] == "ValueError"
+    assert all(span.end_time >= span.start_time for span in spans)
+
+
+# Test tail sampling keeps calls ending with an exception that is not retried
+def test_attempt_log_records_non_retried_exception():
+    log = AttemptLog(sample_rate=0.0, sampling="tail")
+    errors = iter([ValueError("Simulated transient error."), KeyError("Simulated bug.")])
+
+    @Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0), retry_on_exceptions=(ValueError,),
+           attempt_log=log)
+    def failing():
+        raise next(errors)
+
+    with pytest.raises(KeyError):
+        failing()
+    assert [(r.attempt, r.outcome, r.exception) for r in log.snapshot()] == [
+        (1, "error", "ValueError"), (2, "error", "KeyError")
+    ]
+
+
+# Test cancelling a sleeping retry does not record an attempt that never ran
+def test_attempt_log_cancel_during_sleep():
+    log = AttemptLog()
+
+    @Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(30), retry_on_result=lambda r: r is None,
+           attempt_log=log)
+    async def empty():
+        return None
+
+    async def cancel():
+        task = asyncio.ensure_future(empty())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    assert [(r.attempt, r.outcome) for r in log.snapshot()] == [(1, "rejected")]
+
+
+# Test each run of a stream producer is recorded as an attempt
+def test_attempt_log_records_stream_runs():
+    log = AttemptLog()
+    failed = []
+
+    @Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0), attempt_log=log).stream()
+    def producer(offset=0):
+        for i in range(offset, 4):
+            if i == 2 and not failed:
+                failed.append(i)
+                raise ConnectionError("Simulated dropped connection.")
+            yield i
+
+    assert list(producer()) == [0, 1, 2, 3]
+    records = log.snapshot()
+    assert [(r.attempt, r.outcome, r.exception) for r in records] == [
+        (1, "error", "ConnectionError"), (1, "ok", None)
+    ]
+    assert len({r.call_id for r in records}) == 1
+
+
+# Test a stream fails fast while its failure state is open
+def test_stream_failure_state():
+    state = FailureState(failure_threshold=2, reset_timeout=30)
+
+    @Retry(stop_condition=stop_after_attempt(5), wait_condition=wait_fixed(0), failure_state=state).stream()
+    def broken(offset=0):
+        raise ConnectionError("Simulated dropped connection.")
+        yield offset
+
+    with pytest.raises(CircuitOpenError):
+        list(broken())
+    assert state.total_failures == 2
+
+
+# Test exporters must implement export
+def test_attempt_exporter_is_abstract():
+    with pytest.raises(TypeError):
+        AttemptExporter()
@@ -0,0 +1,140 @@
+import io
+import os
+import math
+import json
+from retry import AttemptLog, JsonLinesExporter, Retry, stop_after_attempt, wait_fixed
+from retry.autotune import TraceSummary, summarize_traces, replay, tune, main
+
+
+def make_summary():
+    summary = TraceSummary()
+    for _ in range(90):
+        summary.add_call(1, 0.1)
+    for _ in range(9):
+        summary.add_call(2, 0.2)
+    summary.add_call(3, 0.3)
+    return summary
+
+
+# Test traces are summarized by the attempt of first success
+def test_summarize_traces():
+    lines = [
+        {"call_id": 1, "attempt": 1, "outcome": "ok", "latency": 0.1},
+        {"call_id": 2, "attempt": 1, "outcome": "error", "latency": 0.2},
+        {"call_id": 2, "attempt": 2, "outcome": "ok", "latency": 0.3},
+        {"call_id": 3, "attempt": 1, "outcome": "error", "latency": 0.4},
+    ]
+    summary = summarize_traces(json.dumps(line) for line in lines)
+    assert summary.calls == 3
+    assert summary.failed == 1
+    assert list(summary.successes[1]) == [0.1]
+    assert list(summary.successes[2]) == [0.5]
+
+
+# Test replay adds the policy waits to the recorded latencies
+def test_replay():
+    summary = make_summary()
+    candidate = replay(summary, attempts=3, multiplier=1, min_wait=1, max_wait=1)
+    assert candidate.success_rate == 1.0
+    assert math.isclose(candidate.amplification, (90 + 9 * 2 + 3) / 100)
+    assert math.isclose(candidate.p99, 1.2, rel_tol=1e-6)
+    single = replay(summary, attempts=1, multiplier=1, min_wait=1, max_wait=1)
+    assert math.isclose(single.success_rate, 0.9)
+    assert math.isclose(single.p99, 0.1, rel_tol=1e-6)  # Calls failing after one attempt end within it
+
+
+# Test the recommended policy minimizes the quantile within the amplification cap
+def test_tune():
+    summary = make_summary()
+    best = tune(summary, attempts=(1, 2, 3), multipliers=(0.1,), min_waits=(0.1, 1), max_waits=(1,),
+                max_amplification=1.105)[0]
+    assert (best.attempts, best.min_wait) == (2, 0.1)
+    assert math.isclose(best.p99, 0.3, rel_tol=1e-6)
+    assert tune(summary, attempts=(3,), max_amplification=1.0) == []
+    assert best.to_retry().stop_condition(2, None, None)
+
+
+# Test traces written by the attempt log can be tuned
+def test_tune_attempt_log_traces(tmp_path, capsys):
+    stream = io.StringIO()
+    log = AttemptLog(exporter=JsonLinesExporter(stream))
+    state = {"calls": 0}
+
+    @Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0), attempt_log=log)
+    def flaky():
+        state["calls"] += 1
+        if state["calls"] % 3 == 0:
+            raise ValueError("Simulated transient error.")
+        return "Success"
+
+    for _ in range(50):
+        flaky()
+    log.flush()
+    path = tmp_path / "traces.jsonl"
+    path.write_text(stream.getvalue())
+    main([str(path), "--top", "1"])
+    assert "stop_after_attempt(2)" in capsys.readouterr().out
+
+
+# Test calls with the same id from different workers or functions are kept apart
+def test_summarize_traces_groups_by_name_and_call_id():
+    lines = [
+        {"call_id": 1, "name": "a", "attempt": 1, "outcome": "ok", "latency": 0.1},
+        {"call_id": 1, "name": "b", "attempt": 1, "outcome": "error", "latency": 0.2},
+        {"call_id": 1, "name": "b", "attempt": 2, "outcome": "error", "latency": 0.2},
+        {"call_id": 1, "name": "a", "attempt": 1, "outcome": "ok", "latency": 0.3},
+    ]
+    summary = summarize_traces(json.dumps(line) for line in lines)
+    assert summary.calls == 3
+    assert summary.failed == 1
+    assert sorted(summary.successes[1]) == [0.1, 0.3]
+
+
+# Test call ids of different attempt logs never collide
+def test_attempt_log_call_ids_are_unique():
+    first, second = AttemptLog(), AttemptLog()
+    Retry(attempt_log=first)(lambda: "Success")()
+    Retry(attempt_log=second)(lambda: "Success")()
+    assert first.snapshot()[0].call_id != second.snapshot()[0].call_id
+    assert first.snapshot()[0].call_id.startswith("{}-".format(os.getpid()))
+
+
+# Test latencies stay comparable when more calls fail than the quantile allows
+def test_tune_with_failed_calls():
+    summary = TraceSummary()
+    for _ in range(95):
+        summary.add_call(1, 0.1)
+    for _ in range(5):
+        summary.add_call(None, cumulative=[0.05, 0.1, 0.15])
+    candidates = tune(summary, attempts=(1, 3), multipliers=(0.1,), min_waits=(0, 1), max_waits=(1,),
+                      max_amplification=3)
+    assert all(math.isfinite(candidate.p99) for candidate in candidates)
+    assert all(math.isclose(candidate.success_rate, 0.95) for candidate in candidates)
+    assert (candidates[0].attempts, candidates[0].min_wait) == (1, 0)
+    assert math.isclose(candidates[0].p99, 0.1, rel_tol=1e-6)
+    slow, fast = (replay(summary, 3, 0.1, min_wait, 1) for min_wait in (1, 0))
+    assert math.isclose(slow.p99, 0.15 + 2, rel_tol=1e-6)  # Failed calls pay the waits before attempts 2 and 3
+    assert fast.p99 < slow.p99
+
+
+# Test the success rate is a constraint separate from the latency
+def test_tune_min_success_rate():
+    summary = make_summary()
+    best = tune(summary, attempts=(1, 2), multipliers=(0.1,), min_waits=(0.1,), max_waits=(1,),
+                min_success_rate=0.0)[0]
+    assert best.attempts == 1
+    assert tune(summary, attempts=(1, 2), multipliers=(0.1,), min_waits=(0.1,), max_waits=(1,))[0].attempts == 2
+
+
+# Test a failed attempt without a further attempt ends its call
+def test_summarize_traces_ends_failed_calls():
+    lines = [
+        {"call_id": 1, "attempt": 1, "outcome": "error", "latency": 0.1, "delay": 0.5},
+        {"call_id": 1, "attempt": 2, "outcome": "error", "latency": 0.2, "delay": None},
+        {"call_id": 1, "attempt": 1, "outcome": "ok", "latency": 0.3, "delay": None},
+    ]
+    summary = summarize_traces(json.dumps(line) for line in lines)
+    assert summary.calls == 2
+    assert summary.failed == 1
+    assert math.isclose(summary.exhausted[2][0], 0.3)
+    assert list(summary.successes[1]) == [0.3]
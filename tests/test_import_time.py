@@ -0,0 +1,47 @@
+import os
+import sys
+import subprocess
+
+# Budget in microseconds for importing the minimal sync decorator path, overridable on slow machines
+IMPORT_BUDGET_US = int(os.environ.get("RETRY_IMPORT_BUDGET_US", "50000"))
+MINIMAL_IMPORT = "from retry import Retry, stop_after_attempt, wait_fixed"
+
+
+def import_time_us(statement):
+    """Cumulative import time of the retry package reported by ``python -X importtime``."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                               stderr=subprocess.PIPE, universal_newlines=True, check=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for line in completed.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "retry":
+            return int(fields[1])
+    raise AssertionError("retry not found in importtime output")
+
+
+def imported_modules(statement):
+    completed = subprocess.run([sys.executable, "-c", statement + "; import sys; print(' '.join(sys.modules))"],
+                               stdout=subprocess.PIPE, universal_newlines=True, check=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return set(completed.stdout.split())
+
+
+# Test the minimal sync decorator path stays within the import time budget
+def test_import_time_budget():
+    best = min(import_time_us(MINIMAL_IMPORT) for _ in range(3))  # Best of three to reduce noise
+    assert best <= IMPORT_BUDGET_US, "import retry took {}us, budget is {}us".format(best, IMPORT_BUDGET_US)
+
+
+# Test optional subsystems are not imported by the sync decorator path
+def test_minimal_import_is_lazy():
+    modules = imported_modules(MINIMAL_IMPORT)
+    for module in ("asyncio", "typing", "json", "mmap", "concurrent.futures",
+                   "retry.attempt_log", "retry.autotune", "retry.pool", "retry.shared_state", "retry.state"):
+        assert module not in modules
+
+
+# Test lazy attributes are imported on first use
+def test_lazy_attributes():
+    modules = imported_modules("import retry; retry.AttemptLog; retry.autotune")
+    assert "retry.attempt_log" in modules and "retry.autotune" in modules
+    assert "retry.pool" not in modules
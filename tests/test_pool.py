@@ -0,0 +1,131 @@
+import os
+import multiprocessing
+import pytest
+from retry import Retry, RetryError, AttemptLog, FailureState, stop_after_attempt, wait_fixed
+
+pytestmark = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="requires fork")
+
+
+def square(item):
+    return item * item
+
+
+def crash_once(args):
+    marker, item = args
+    if item == 3 and not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)  # Simulate a worker killed by a segfault or the OOM killer
+    return item * item
+
+
+def fail_once(args):
+    marker, item = args
+    path = "{}-{}".format(marker, item)
+    if item % 2 and not os.path.exists(path):
+        open(path, "w").close()
+        raise ValueError("Simulated transient error.")
+    return item * item
+
+
+def always_fail(item):
+    raise ValueError("Simulated permanent error.")
+
+
+def make_retry(attempts=3):
+    return Retry(stop_condition=stop_after_attempt(attempts), wait_condition=wait_fixed(0))
+
+
+# Test results are returned in order with chunked dispatch
+def test_map_in_pool_results():
+    context = multiprocessing.get_context("fork")
+    assert make_retry().map_in_pool(square, range(20), max_workers=2, chunksize=4, mp_context=context) == \
+        [item * item for item in range(20)]
+
+
+# Test a crashed worker is replaced and lost tasks are re-dispatched
+def test_map_in_pool_recovers_broken_pool(tmp_path):
+    context = multiprocessing.get_context("fork")
+    items = [(str(tmp_path / "crashed"), item) for item in range(8)]
+    assert make_retry().map_in_pool(crash_once, items, max_workers=2, chunksize=2, mp_context=context) == \
+        [item * item for item in range(8)]
+
+
+# Test failed tasks are retried individually
+def test_map_in_pool_retries_failed_tasks(tmp_path):
+    context = multiprocessing.get_context("fork")
+    items = [(str(tmp_path / "failed"), item) for item in range(6)]
+    assert make_retry().map_in_pool(fail_once, items, max_workers=2, chunksize=3, mp_context=context) == \
+        [item * item for item in range(6)]
+
+
+# Test the stop condition applies per task
+def test_map_in_pool_stop_condition():
+    context = multiprocessing.get_context("fork")
+    with pytest.raises(RetryError):
+        make_retry(2).map_in_pool(always_fail, range(3), max_workers=1, mp_context=context)
+
+
+def crash_always(item):
+    if item == 5:
+        os._exit(1)  # Poison task killing every worker it runs on
+    return item * item
+
+
+# Test only the task crashing the pool is charged with attempts
+def test_map_in_pool_blames_crashing_task():
+    from concurrent.futures.process import BrokenProcessPool
+    from retry.pool import PoolRunner
+    context = multiprocessing.get_context("fork")
+    runner = PoolRunner(make_retry(), crash_always, max_workers=4, chunksize=2, mp_context=context)
+    with pytest.raises(RetryError) as excinfo:
+        runner.map(range(8))
+    assert isinstance(excinfo.value.last_attempt, BrokenProcessPool)
+    assert runner.attempts[5] == 3
+    assert [attempts for index, attempts in enumerate(runner.attempts) if index != 5] == [0] * 7
+
+
+# Test a single exception class is accepted as retry_on_exceptions
+def test_map_in_pool_single_exception_class(tmp_path):
+    context = multiprocessing.get_context("fork")
+    retry = Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0), retry_on_exceptions=ValueError)
+    items = [(str(tmp_path / "failed"), item) for item in range(4)]
+    assert retry.map_in_pool(fail_once, items, max_workers=2, mp_context=context) == [item * item for item in range(4)]
+
+
+# Test chunks lost in a crash run again in parallel, only tasks lost again on their own run alone
+def test_map_in_pool_isolates_few_tasks():
+    from retry.pool import PoolRunner
+    isolated = []
+
+    class Runner(PoolRunner):
+        def _submit_ready(self):
+            if self.suspects and not self.running and self.isolated is None:
+                isolated.append(self.suspects[0])
+            super()._submit_ready()
+
+    context = multiprocessing.get_context("fork")
+    runner = Runner(make_retry(), crash_always, max_workers=4, chunksize=5, mp_context=context)
+    with pytest.raises(RetryError):
+        runner.map(range(40))
+    assert 5 in isolated
+    assert len(set(isolated)) < 8
+
+
+# Test tasks use the callbacks, failure state and attempt log of the Retry
+def test_map_in_pool_callbacks_and_attempt_log(tmp_path):
+    calls = {"before": 0, "after": 0}
+    log = AttemptLog()
+    state = FailureState(failure_threshold=10)
+    retry = Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0), attempt_log=log,
+                  failure_state=state, before=lambda retry: calls.update(before=calls["before"] + 1),
+                  after=lambda retry: calls.update(after=calls["after"] + 1))
+    context = multiprocessing.get_context("fork")
+    items = [(str(tmp_path / "failed"), item) for item in range(4)]
+    assert retry.map_in_pool(fail_once, items, max_workers=2, chunksize=2, mp_context=context) == [0, 1, 4, 9]
+    assert calls == {"before": 6, "after": 4}
+    assert state.total_failures == 2
+    records = log.snapshot()
+    assert sorted((r.attempt, r.outcome) for r in records) == [
+        (1, "error"), (1, "error"), (1, "ok"), (1, "ok"), (2, "ok"), (2, "ok")
+    ]
+    assert len({r.call_id for r in records}) == 4
@@ -177,3 +177,30 @@ def test_wait_exponential():
     assert wait_time_fn(4) == 8  # 2 ** (4 - 1) = 8
     assert wait_time_fn(5) == 10  # max_wait should be applied
     assert wait_time_fn(6) == 10  # max_wait should be applied
+
+
+# Test callables marked as coroutine functions are retried as coroutines
+def test_marked_coroutine_function():
+    import inspect
+    calls = []
+
+    class Handler:
+        async def handle(self):
+            calls.append(1)
+            if len(calls) < 2:
+                raise ValueError("Simulated transient error.")
+            return "Success"
+
+        def __call__(self):
+            return self.handle()
+
+    handler = Handler()
+    if hasattr(inspect, "markcoroutinefunction"):
+        inspect.markcoroutinefunction(handler)  # As asgiref does for its sync_to_async objects
+    elif hasattr(asyncio.coroutines, "_is_coroutine"):
+        Handler._is_coroutine = asyncio.coroutines._is_coroutine
+    else:
+        pytest.skip("no coroutine marker available")
+    wrapped = Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0))(handler)
+    assert asyncio.run(wrapped()) == "Success"
+    assert len(calls) == 2
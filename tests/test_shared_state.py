@@ -0,0 +1,87 @@
+import multiprocessing
+import pytest
+from retry import (
+    Retry, RetryError, CircuitOpenError, SharedRetryState, stop_after_attempt, wait_fixed
+)
+from retry.shared_state import _SEQUENCE
+
+
+def failing():
+    raise ConnectionError("Simulated dependency outage.")
+
+
+def record_failures(path, count):
+    state = SharedRetryState(path).policy("payments", failure_threshold=100)
+    for _ in range(count):
+        state.record_failure()
+
+
+# Test two mappings of the same file see the same policy state
+def test_shared_state_visible_across_mappings(tmp_path):
+    path = str(tmp_path / "retry.state")
+    first = SharedRetryState(path).policy("payments", failure_threshold=2)
+    second = SharedRetryState(path).policy("payments", failure_threshold=2)
+    other = SharedRetryState(path).policy("search", failure_threshold=2)
+    first.record_failure()
+    assert second.failures == 1
+    assert other.failures == 0
+    assert not second.is_open()
+    first.record_failure()
+    assert second.is_open()
+    second.record_success()
+    assert not first.is_open()
+    assert first.failures == 0
+    assert first.total_failures == 2
+
+
+# Test counters are updated atomically by concurrent processes
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="requires fork")
+def test_shared_state_across_processes(tmp_path):
+    path = str(tmp_path / "retry.state")
+    state = SharedRetryState(path).policy("payments", failure_threshold=100)
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=record_failures, args=(path, 50)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert state.total_failures == 200
+
+
+# Test an open policy makes every Retry fail fast
+def test_retry_fails_fast_when_open(tmp_path):
+    state = SharedRetryState(str(tmp_path / "retry.state")).policy("payments", failure_threshold=2)
+    retry = Retry(stop_condition=stop_after_attempt(5), wait_condition=wait_fixed(0), failure_state=state)
+    with pytest.raises(CircuitOpenError) as excinfo:
+        retry(failing)()
+    assert isinstance(excinfo.value.last_attempt, ConnectionError)
+    assert state.total_failures == 2
+    with pytest.raises(RetryError):
+        retry(lambda: "Success")()
+
+
+# Test a writer killed mid-write does not block later reads and writes
+def test_shared_state_recovers_from_torn_write(tmp_path):
+    shared = SharedRetryState(str(tmp_path / "retry.state"))
+    state = shared.policy("payments", failure_threshold=100)
+    offset = shared._offset(state.index)
+    _SEQUENCE.pack_into(shared._mmap, offset, 3)  # Sequence left odd by a dead writer
+    assert state.failures == 0
+    state.record_failure()
+    assert _SEQUENCE.unpack_from(shared._mmap, offset)[0] % 2 == 0
+    _SEQUENCE.pack_into(shared._mmap, offset, 5)
+    state.record_failure()
+    assert _SEQUENCE.unpack_from(shared._mmap, offset)[0] % 2 == 0
+    assert state.failures == 2
+    assert not state.is_open()
+
+
+# Test every mapping uses the slot count stored in the file
+def test_shared_state_slot_count_is_stored(tmp_path):
+    path = str(tmp_path / "retry.state")
+    first = SharedRetryState(path, slots=128)
+    second = SharedRetryState(path)
+    assert second.slots == 128
+    assert second.policy("auth").index == first.policy("auth").index
+    with pytest.raises(ValueError):
+        SharedRetryState(path, slots=64)
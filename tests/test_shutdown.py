@@ -0,0 +1,136 @@
+import time
+import asyncio
+import threading
+import multiprocessing
+import pytest
+from retry import Retry, RetryError, ShutdownHandle, stop_after_attempt, wait_fixed
+
+
+def always_fail(item):
+    raise ValueError("Simulated permanent error.")
+
+
+def wait_in_flight(handle, count=1):
+    deadline = time.monotonic() + 5
+    while handle.in_flight < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+# Test shutdown wakes a sleeping retry and makes it fail fast
+def test_shutdown_fails_fast(make_flaky):
+    handle = ShutdownHandle()
+    func = Retry(stop_condition=stop_after_attempt(5), wait_condition=wait_fixed(30), shutdown=handle)(make_flaky(5))
+    errors = []
+
+    def run():
+        try:
+            func()
+        except RetryError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    started = time.monotonic()
+    thread.start()
+    wait_in_flight(handle)
+    assert handle.trigger() == 1
+    assert handle.drain(timeout=5)
+    thread.join()
+    assert time.monotonic() - started < 5
+    assert isinstance(errors[0].last_attempt, ValueError)
+    assert handle.in_flight == 0
+
+
+# Test shutdown runs one final attempt when configured
+def test_shutdown_final_attempt(make_flaky):
+    handle = ShutdownHandle(final_attempt=True)
+    handle.trigger()
+    func = Retry(stop_condition=stop_after_attempt(5), wait_condition=wait_fixed(30), shutdown=handle)
+    assert func(make_flaky(1))() == "Success"
+    with pytest.raises(RetryError):
+        func(make_flaky(2))()
+
+
+# Test shutdown wakes a sleeping coroutine
+def test_shutdown_wakes_async_retry():
+    handle = ShutdownHandle()
+
+    @Retry(stop_condition=stop_after_attempt(5), wait_condition=wait_fixed(30), shutdown=handle)
+    async def failing():
+        raise ValueError("Simulated transient error.")
+
+    async def main():
+        task = asyncio.ensure_future(failing())
+        while handle.in_flight == 0:
+            await asyncio.sleep(0.01)
+        threading.Thread(target=handle.trigger).start()
+        with pytest.raises(RetryError):
+            await asyncio.wait_for(task, 5)
+
+    asyncio.run(main())
+    assert handle.in_flight == 0
+
+
+# Test a recovering stream is counted in flight and woken by shutdown
+def test_shutdown_stream_in_flight():
+    handle = ShutdownHandle()
+
+    @Retry(stop_condition=stop_after_attempt(5), wait_condition=wait_fixed(30), shutdown=handle).stream()
+    def producer(offset=0):
+        yield offset
+        raise ValueError("Simulated dropped connection.")
+
+    errors = []
+
+    def run():
+        try:
+            list(producer())
+        except RetryError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    wait_in_flight(handle)
+    assert handle.trigger() == 1
+    assert handle.drain(timeout=5)
+    thread.join()
+    assert isinstance(errors[0].last_attempt, ValueError)
+
+
+# Test an interrupted stream runs one final attempt when configured
+def test_shutdown_stream_final_attempt():
+    handle = ShutdownHandle(final_attempt=True)
+    handle.trigger()
+    calls = []
+
+    @Retry(stop_condition=stop_after_attempt(5), wait_condition=wait_fixed(30), shutdown=handle).stream()
+    def producer(offset=0):
+        calls.append(offset)
+        if len(calls) == 1:
+            raise ValueError("Simulated dropped connection.")
+        yield from range(offset, 3)
+
+    assert list(producer()) == [0, 1, 2]
+    assert handle.in_flight == 0
+
+
+# Test pool tasks waiting for their next attempt are counted in flight and woken by shutdown
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="requires fork")
+def test_shutdown_pool_in_flight():
+    handle = ShutdownHandle()
+    retry = Retry(stop_condition=stop_after_attempt(5), wait_condition=wait_fixed(30), shutdown=handle)
+    errors = []
+
+    def run():
+        try:
+            retry.map_in_pool(always_fail, range(2), max_workers=2, mp_context=multiprocessing.get_context("fork"))
+        except RetryError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    wait_in_flight(handle, 2)
+    assert handle.trigger() == 2
+    assert handle.drain(timeout=5)
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert len(errors) == 1
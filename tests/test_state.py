@@ -0,0 +1,126 @@
+import time
+import threading
+import pytest
+from retry import (
+    Retry, RetryError, CircuitOpenError, FailureState, KeyedFailureState, SharedRetryState, stop_after_attempt, wait_fixed
+)
+
+
+def make_client(state, wait_condition=wait_fixed(0)):
+    @Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_condition, failure_state=state)
+    def fetch(shard, query):
+        if shard == "bad":
+            raise ConnectionError("Simulated shard outage.")
+        return "{}:{}".format(shard, query)
+
+    return fetch
+
+
+# Test a single failure state opens after the threshold
+def test_failure_state_opens():
+    state = FailureState(failure_threshold=2)
+    fetch = make_client(state)
+    with pytest.raises(CircuitOpenError):
+        fetch("bad", "q")
+    assert state.is_open()
+    with pytest.raises(CircuitOpenError):
+        fetch("good", "q")
+
+
+# Test a failing key does not affect the other keys
+def test_keyed_failure_state_isolates_keys():
+    states = KeyedFailureState(lambda shard, query: shard, factory=lambda key: FailureState(failure_threshold=2))
+    fetch = make_client(states)
+    with pytest.raises(CircuitOpenError):
+        fetch("bad", "q")
+    assert states.get("bad").is_open()
+    assert fetch("good", "q") == "good:q"
+    assert not states.get("good").is_open()
+
+
+# Test the table evicts the least recently used key
+def test_keyed_failure_state_lru_eviction():
+    states = KeyedFailureState(lambda key: key, maxsize=2)
+    first = states.get("a")
+    states.get("b")
+    assert states.get("a") is first
+    states.get("c")
+    assert len(states) == 2
+    assert "a" in states and "b" not in states
+
+
+# Test unused keys expire after the ttl
+def test_keyed_failure_state_ttl():
+    states = KeyedFailureState(lambda key: key, ttl=0.01)
+    first = states.get("a")
+    time.sleep(0.02)
+    assert states.get("a") is not first
+    assert len(states) == 1
+
+
+# Test keyed states can be backed by shared memory
+def test_keyed_shared_state(tmp_path):
+    shared = SharedRetryState(str(tmp_path / "retry.state"))
+    states = KeyedFailureState(lambda shard, query: shard, factory=lambda key: shared.policy(key, failure_threshold=2))
+    fetch = make_client(states)
+    with pytest.raises(CircuitOpenError):
+        fetch("bad", "q")
+    assert shared.policy("bad").failures == 2
+    assert fetch("good", "q") == "good:q"
+
+
+# Test more keys than shared slots recycle slots instead of failing
+def test_keyed_shared_state_recycles_slots(tmp_path):
+    shared = SharedRetryState(str(tmp_path / "retry.state"), slots=4)
+    states = KeyedFailureState(lambda shard, query: shard, maxsize=2,
+                               factory=lambda key: shared.policy(key, failure_threshold=2))
+    fetch = make_client(states)
+    for shard in range(100):
+        with pytest.raises(CircuitOpenError):
+            fetch("bad", shard)  # Keep one policy failing
+        assert fetch("shard-{}".format(shard), "q") == "shard-{}:q".format(shard)
+    assert states.get("bad").is_open()
+    recycled = shared.policy("shard-0")
+    assert recycled.failures == 0 and not recycled.is_open()
+
+
+# Test backoff continues per key from the failures of earlier calls
+def test_keyed_backoff_history():
+    waits = []
+    states = KeyedFailureState(lambda shard, query: shard,
+                               factory=lambda key: FailureState(failure_threshold=100, backoff_history=True))
+    fetch = make_client(states, wait_condition=lambda attempt: waits.append(attempt) or 0)
+    for _ in range(2):
+        with pytest.raises(RetryError):
+            fetch("bad", "q")
+    assert waits == [1, 2, 4, 5]
+    assert fetch("good", "q") == "good:q"
+    assert waits == [1, 2, 4, 5]
+
+
+# Test retries are throttled per key once the token bucket is half empty
+def test_keyed_retry_throttling():
+    states = KeyedFailureState(lambda shard, query: shard,
+                               factory=lambda key: FailureState(failure_threshold=100, max_tokens=4, token_ratio=1))
+    fetch = make_client(states)
+    with pytest.raises(RetryError):
+        fetch("bad", "q")
+    assert states.get("bad").total_failures == 2
+    assert states.get("good").tokens == 4
+    assert fetch("good", "q") == "good:q"
+
+
+# Test failures recorded by concurrent threads are all counted
+def test_failure_state_thread_safe():
+    state = FailureState(failure_threshold=10 ** 6)
+
+    def record():
+        for _ in range(1000):
+            state.record_failure()
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state.total_failures == 8000
@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from retry import Retry, RetryError, stop_after_attempt, wait_fixed
+
+
+# Producer that fails once in the middle of the stream
+def make_flaky_producer(total, fail_at):
+    calls = []
+
+    @Retry(
+        stop_condition=stop_after_attempt(3),
+        wait_condition=wait_fixed(0),
+        retry_on_exceptions=(ConnectionError,)
+    ).stream()
+    def producer(offset=0):
+        calls.append(offset)
+        for i in range(offset, total):
+            if i == fail_at and len(calls) == 1:
+                raise ConnectionError("Simulated dropped connection.")
+            yield i
+
+    return producer, calls
+
+
+# Test stream resumes from the last offset
+def test_stream_resumes_from_offset():
+    producer, calls = make_flaky_producer(10, 6)
+    assert list(producer()) == list(range(10))
+    assert calls == [0, 6]
+
+
+# Test stream with a custom cursor checkpoint
+def test_stream_custom_checkpoint():
+    pages = {None: ("a", "t1"), "t1": ("b", "t2"), "t2": ("c", None)}
+    failed = []
+
+    @Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0)).stream(
+        checkpoint=lambda token, page: page[1], start=None, resume_kwarg="token"
+    )
+    def read_pages(token=None):
+        while True:
+            if token == "t2" and not failed:
+                failed.append(token)
+                raise TimeoutError("Simulated timeout.")
+            page = pages[token]
+            yield page
+            token = page[1]
+            if token is None:
+                return
+
+    assert [page[0] for page in read_pages()] == ["a", "b", "c"]
+    assert failed == ["t2"]
+
+
+# Test stream gives up when the producer keeps failing without progress
+def test_stream_stop_condition():
+    @Retry(stop_condition=stop_after_attempt(2), wait_condition=wait_fixed(0)).stream()
+    def broken(offset=0):
+        if offset == 0:
+            yield offset
+        raise ValueError("Simulated permanent error.")
+
+    with pytest.raises(RetryError):
+        list(broken())
+
+
+# Test async stream resumes from the last offset
+def test_async_stream_resumes_from_offset():
+    calls = []
+
+    @Retry(stop_condition=stop_after_attempt(3), wait_condition=wait_fixed(0)).stream()
+    async def producer(offset=0):
+        calls.append(offset)
+        for i in range(offset, 5):
+            if i == 3 and len(calls) == 1:
+                raise ConnectionError("Simulated dropped connection.")
+            yield i
+
+    async def consume():
+        return [item async for item in producer()]
+
+    assert asyncio.run(consume()) == list(range(5))
+    assert calls == [0, 3]
+
+
+# Test the caller's own checkpoint takes precedence over start
+def test_stream_resumes_from_caller_offset():
+    producer, calls = make_flaky_producer(10, 12)
+    assert list(producer(offset=7)) == [7, 8, 9]
+    assert calls == [7]
+    producer, calls = make_flaky_producer(10, 8)
+    assert list(producer(offset=5)) == [5, 6, 7, 8, 9]
+    assert calls == [5, 8]